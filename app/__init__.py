@@ -5,6 +5,11 @@ from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_admin import Admin
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.cache import ResponseCache
+from app.paystack import PaystackClient
+from app.ratelimit import RateLimiter
+from datetime import timedelta
 import os
 from dotenv import load_dotenv
 import logging
@@ -13,6 +18,9 @@ db = SQLAlchemy()
 migrate = Migrate()
 bcrypt = Bcrypt()
 jwt = JWTManager()
+cache = ResponseCache()
+paystack = PaystackClient()
+limiter = RateLimiter()
 
 
 log_file = '/tmp/app.log' if os.environ.get('VERCEL') else 'app.log'
@@ -50,12 +58,58 @@ def create_app():
     
     logging.debug(f"DATABASE_URL: {os.environ.get('DATABASE_URL', 'Not set')}")
 
+    # Proxies in front of the app that append to X-Forwarded-For (Vercel's edge is one).
+    app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 1 if os.environ.get('VERCEL') else 0))
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default-secret-key')
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', 30)))
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    app.config['HASH_WORKERS'] = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 1))
+    app.config['HASH_QUEUE'] = int(os.environ.get('HASH_QUEUE', max(app.config['HASH_WORKERS'], 1) * 8))
+    app.config['HASH_TIMEOUT'] = float(os.environ.get('HASH_TIMEOUT', 5))
+    app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 60))
+    app.config['USER_CACHE_MAX_ENTRIES'] = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 4096))
+    app.config['REVOCATION_SYNC_SECONDS'] = float(os.environ.get('REVOCATION_SYNC_SECONDS', 5))
     app.config['PAYSTACK_SECRET_KEY'] = os.environ.get('PAYSTACK_SECRET_KEY')
+    app.config['PAYSTACK_CURRENCY'] = os.environ.get('PAYSTACK_CURRENCY', 'NGN')
+    app.config['PAYSTACK_BASE_URL'] = os.environ.get('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+    app.config['PAYSTACK_CONNECT_TIMEOUT'] = float(os.environ.get('PAYSTACK_CONNECT_TIMEOUT', 3.05))
+    app.config['PAYSTACK_READ_TIMEOUT'] = float(os.environ.get('PAYSTACK_READ_TIMEOUT', 10))
+    app.config['PAYSTACK_RETRIES'] = int(os.environ.get('PAYSTACK_RETRIES', 3))
+    app.config['PAYSTACK_POOL_SIZE'] = int(os.environ.get('PAYSTACK_POOL_SIZE', 10))
+    app.config['PAYSTACK_RECHECK_SECONDS'] = float(os.environ.get('PAYSTACK_RECHECK_SECONDS', 5))
     app.config['FLASK_ADMIN_SWATCH'] = 'cerulean'
+    app.config['RESPONSE_CACHE_BACKEND'] = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    app.config['RESPONSE_CACHE_PATH'] = os.environ.get('RESPONSE_CACHE_PATH')
+    app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    app.config['RATE_LIMIT_BACKEND'] = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    app.config['RATE_LIMIT_PATH'] = os.environ.get('RATE_LIMIT_PATH')
+    app.config['RATE_LIMIT_MAX_ENTRIES'] = int(os.environ.get('RATE_LIMIT_MAX_ENTRIES', 10000))
+    app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', os.cpu_count() or 1))
+    app.config['IMAGE_TIMEOUT'] = float(os.environ.get('IMAGE_TIMEOUT', 30))
+    app.config['LIKE_WRITE_BEHIND'] = os.environ.get('LIKE_WRITE_BEHIND', 'false').lower() in ('1', 'true')
+    app.config['LIKE_FLUSH_INTERVAL'] = float(os.environ.get('LIKE_FLUSH_INTERVAL', 2))
+    app.config['LIKE_FLUSH_SIZE'] = int(os.environ.get('LIKE_FLUSH_SIZE', 500))
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'localhost')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 25))
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'false').lower() in ('1', 'true')
+    app.config['MAIL_USE_SSL'] = os.environ.get('MAIL_USE_SSL', 'false').lower() in ('1', 'true')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'newsletter@senideafoundation.org')
+    app.config['MAIL_TIMEOUT'] = float(os.environ.get('MAIL_TIMEOUT', 30))
+    app.config['MAIL_CONNECTIONS'] = int(os.environ.get('MAIL_CONNECTIONS', 4))
+    app.config['MAIL_RATE_PER_MINUTE'] = float(os.environ.get('MAIL_RATE_PER_MINUTE', 600))
+    app.config['MAIL_BATCH_SIZE'] = int(os.environ.get('MAIL_BATCH_SIZE', 200))
+
+    if app.config['PROXY_FIX_X_FOR']:
+        # Only the hops our own proxies appended are trusted, so request.remote_addr is the
+        # real client even when it sends its own X-Forwarded-For.
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
     CORS(app, resources={r"/api/*": {
         "origins": [
@@ -87,6 +141,9 @@ def create_app():
         migrate.init_app(app, db)
         bcrypt.init_app(app)
         jwt.init_app(app)
+        cache.init_app(app)
+        paystack.init_app(app)
+        limiter.init_app(app)
         logging.debug("Extensions initialized successfully")
     except Exception as e:
         logging.error(f"Error initializing extensions: {str(e)}")
@@ -97,6 +154,14 @@ def create_app():
             logging.debug("Database tables created")
         except Exception as e:
             logging.error(f"Error creating database tables: {str(e)}")
+        try:
+            # The full-text tables are raw DDL that create_all doesn't know about.
+            from app.search import ensure_schema
+            ensure_schema()
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error creating search index tables: {str(e)}")
+            db.session.rollback()
 
     from app.models import User, Content, Donation, NewsletterSubscription, ContactMessage, BlogPost, Testimonial, Partnership, Volunteer
     from app.admin.views import AdminModelView, AdminIndex
@@ -132,6 +197,39 @@ def create_app():
     app.register_blueprint(content_bp, url_prefix='/api/content')
     app.register_blueprint(testimonial_bp, url_prefix='/api/testimonial')
 
+    from app.images import build_variants_command
+    app.cli.add_command(build_variants_command)
+    from app.search import rebuild_search_index_command
+    app.cli.add_command(rebuild_search_index_command)
+    from app.rollups import rebuild_donation_rollups_command
+    app.cli.add_command(rebuild_donation_rollups_command)
+    from app.payments import reconcile_donations_command
+    app.cli.add_command(reconcile_donations_command)
+    from app.mailer import send_newsletter_command
+    app.cli.add_command(send_newsletter_command)
+    from app.passwords import bench_password_hashing_command
+    app.cli.add_command(bench_password_hashing_command)
+
+    from app.likes import like_buffer
+    like_buffer.init_app(app)
+
+    from app import identity
+    identity.init_app(app)
+    jwt.user_lookup_loader(identity.load_user)
+
+    from app.revocation import check_if_token_revoked
+    jwt.token_in_blocklist_loader(check_if_token_revoked)
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        logging.error(f"Revoked {jwt_payload.get('type')} token used for user {jwt_payload.get('sub')}")
+        return jsonify({'error': 'revoked_token'}), 401
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_payload):
+        logging.error(f"Token no longer valid for user {jwt_payload.get('sub')}, Request URL: {request.url}")
+        return jsonify({'error': 'invalid_token'}), 401
+
     @jwt.invalid_token_loader
     def invalid_token_callback(error):
         logging.error(f"Invalid token error: {str(error)}, Request URL: {request.url}")
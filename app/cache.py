@@ -0,0 +1,216 @@
+from flask import request, current_app, make_response
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryBackend:
+    """Per-process LRU with TTL. Invalidations are only seen by this worker."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class SQLiteBackend:
+    """LRU with TTL in a local SQLite file, so every worker on the host shares hits
+    and sees every invalidation."""
+
+    # Refresh an entry's LRU position at most this often, to keep hits read-only.
+    TOUCH_INTERVAL = 5
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entry ('
+                'key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, expires REAL, accessed REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed ON cache_entry (accessed)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_version (tag TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT status, headers, body, expires, accessed FROM cache_entry WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, expires, accessed = row
+        now = time.time()
+        if expires < now:
+            conn.execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+            return None
+        if now - accessed > self.TOUCH_INTERVAL:
+            conn.execute('UPDATE cache_entry SET accessed = ? WHERE key = ?', (now, key))
+        return status, json.loads(headers), body
+
+    def set(self, key, value, ttl):
+        status, headers, body = value
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entry (key, status, headers, body, expires, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+            (key, status, json.dumps(headers), body, now + ttl, now)
+        )
+        overflow = conn.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute('DELETE FROM cache_entry WHERE expires < ?', (now,))
+            conn.execute(
+                'DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+                (overflow,)
+            )
+
+    def versions(self, tags):
+        conn = self._connect()
+        placeholders = ','.join('?' * len(tags))
+        found = dict(conn.execute(f'SELECT tag, version FROM cache_version WHERE tag IN ({placeholders})', tags).fetchall())
+        return [found.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        conn = self._connect()
+        for tag in tags:
+            conn.execute(
+                'INSERT INTO cache_version (tag, version) VALUES (?, 1) '
+                'ON CONFLICT(tag) DO UPDATE SET version = version + 1',
+                (tag,)
+            )
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM cache_entry')
+        conn.execute('DELETE FROM cache_version')
+
+
+class ResponseCache:
+    """Caches successful GET responses keyed on route plus query args.
+
+    Every entry is stamped with the current generation of its tags;
+    ``invalidate`` bumps a tag's generation, so stale entries stop matching at
+    once and age out of the LRU on their own.
+    """
+
+    # Headers replayed from the cache; CORS headers are recomputed per request.
+    STORED_HEADERS = ('Content-Type', 'Cache-Control', 'ETag', 'Last-Modified', 'Vary')
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        self.default_ttl = app.config.get('RESPONSE_CACHE_TTL', 300)
+        try:
+            if kind == 'sqlite':
+                path = app.config.get('RESPONSE_CACHE_PATH') or os.path.join(app.instance_path, 'response_cache.db')
+                self.backend = SQLiteBackend(path, max_entries)
+            elif kind == 'memory':
+                self.backend = MemoryBackend(max_entries)
+            else:
+                self.backend = None
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Response cache disabled, backend {kind} failed to start: {str(e)}")
+            self.backend = None
+        app.extensions['response_cache'] = self
+
+    def _key(self, tags):
+        args = urlencode(sorted(request.args.items(multi=True)))
+        versions = self.backend.versions(tags)
+        stamp = ','.join(f'{tag}={version}' for tag, version in zip(tags, versions))
+        return f'{request.path}?{args}#{stamp}'
+
+    def cached(self, tags, ttl=None):
+        """Cache a view's 200 responses. ``tags`` maps the view's kwargs to its tags."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method != 'GET':
+                    return view(*args, **kwargs)
+                try:
+                    key = self._key(list(tags(**kwargs)))
+                    hit = self.backend.get(key)
+                except Exception as e:
+                    logging.error(f"Response cache read failed for {request.path}: {str(e)}")
+                    return view(*args, **kwargs)
+                if hit is not None:
+                    status, headers, body = hit
+                    response = current_app.response_class(body, status=status, headers=headers)
+                    if request.headers.get('Origin'):
+                        response.headers['Access-Control-Allow-Origin'] = request.headers['Origin']
+                    return response.make_conditional(request)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    try:
+                        headers = {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers}
+                        self.backend.set(key, (200, headers, response.get_data()), ttl or self.default_ttl)
+                    except Exception as e:
+                        logging.error(f"Response cache write failed for {request.path}: {str(e)}")
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump(list(tags))
+        except Exception as e:
+            logging.error(f"Response cache invalidation failed for {tags}: {str(e)}")
@@ -0,0 +1,47 @@
+from flask import request, make_response
+from datetime import timezone
+import hashlib
+import json
+
+
+def make_etag(*parts):
+    """Build a strong validator from exactly the values a response renders."""
+    raw = json.dumps(parts, default=str, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:40]
+
+
+def request_args_key():
+    return sorted(request.args.items(multi=True))
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value.tzinfo is None else value.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response when the request's validators still match, else None.
+
+    If-None-Match wins over If-Modified-Since, as RFC 9110 requires.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif last_modified is not None and request.if_modified_since:
+        matched = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+    if not matched:
+        return None
+    return with_validators(make_response('', 304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    return response
+
+
+def revalidate(response):
+    # Always revalidate: the ETag makes a repeat fetch a cheap 304.
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
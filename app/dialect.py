@@ -0,0 +1,30 @@
+from app import db
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def insert_ignore(model, values, index_elements):
+    """INSERT that silently skips rows conflicting on ``index_elements``.
+
+    Compiles to ``ON CONFLICT DO NOTHING`` on Postgres and SQLite, so the
+    existence check and the insert are one race-free statement.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).values(values).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == 'sqlite':
+        return sqlite.insert(model).values(values).on_conflict_do_nothing(index_elements=index_elements)
+    return db.insert(model).values(values).prefix_with('IGNORE')
+
+
+def insert_or_add(model, values, index_elements, columns):
+    """INSERT that, on a conflict over ``index_elements``, adds the new row's
+    ``columns`` onto the existing row instead, in the same statement."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(model).values(values)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: getattr(model, column) + stmt.excluded[column] for column in columns}
+        )
+    stmt = mysql.insert(model).values(values)
+    return stmt.on_duplicate_key_update({column: getattr(model, column) + stmt.inserted[column] for column in columns})
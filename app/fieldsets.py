@@ -0,0 +1,38 @@
+from datetime import datetime
+
+
+class FieldError(ValueError):
+    pass
+
+
+def parse_fields(raw, available, default):
+    """Resolve a ``fields=a,b,c`` argument against the fields a view can serve.
+
+    ``id`` is always returned so clients can link back to the full record.
+    """
+    if not raw:
+        names = list(default)
+    else:
+        names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise FieldError(f"Unknown fields: {', '.join(unknown)}")
+    return ['id'] + [name for name in names if name != 'id']
+
+
+def select_fields(query, available, names):
+    """Narrow ``query`` to just the columns behind ``names``, labelled by field name."""
+    return query.with_entities(*(available[name].label(name) for name in names))
+
+
+def serialize_fields(row, names, formatters=None):
+    formatters = formatters or {}
+    result = {}
+    for name in names:
+        value = getattr(row, name)
+        if name in formatters:
+            value = formatters[name](row, value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        result[name] = value
+    return result
@@ -0,0 +1,65 @@
+from flask import current_app
+from app.cache import MemoryBackend
+from app.models import User
+from sqlalchemy import event, inspect
+from collections import namedtuple
+
+# Changing any of these changes what tokens claim, so older tokens stop being accepted.
+CLAIMED = ('email', 'role')
+
+CachedUser = namedtuple('CachedUser', ['id', 'email', 'role', 'token_version'])
+
+_users = MemoryBackend(max_entries=4096)
+
+
+def init_app(app):
+    _users.max_entries = app.config.get('USER_CACHE_MAX_ENTRIES', 4096)
+
+
+def token_claims(user):
+    return {'email': user.email, 'role': user.role, 'ver': user.token_version or 0}
+
+
+def get_user(user_id):
+    """Return a read-only snapshot of a user, from this process's cache when fresh."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    user = _users.get(user_id)
+    if user is None:
+        row = User.query.with_entities(User.id, User.email, User.role, User.token_version).filter_by(id=user_id).first()
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.email, row.role, row.token_version)
+        # How long a user row is reused by this process before it is read again.
+        _users.set(user_id, user, current_app.config.get('USER_CACHE_TTL', 60))
+    return user
+
+
+def load_user(jwt_header, jwt_data):
+    """``user_lookup_loader`` for flask_jwt_extended.
+
+    The result is kept on ``g`` for the rest of the request, so ``current_user``
+    costs nothing after the token check. Tokens from before the user's last
+    email or role change are refused; tokens without a version predate
+    versioning and count as version 0.
+    """
+    user = get_user(jwt_data.get('sub'))
+    if user is None or jwt_data.get('ver', 0) != user.token_version:
+        return None
+    return user
+
+
+@event.listens_for(User, 'before_update')
+def _bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in CLAIMED):
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_user(mapper, connection, target):
+    # Only this process's copy; other workers catch up within USER_CACHE_TTL.
+    _users.delete(target.id)
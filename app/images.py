@@ -0,0 +1,240 @@
+from PIL import Image, features
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+import click
+import io
+import logging
+import multiprocessing
+import os
+import threading
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_QUALITY = {'JPEG': 80, 'WEBP': 80, 'AVIF': 60}
+FORMAT_MIMETYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+UPLOAD_FORMATS = {
+    'image/jpeg': 'JPEG',
+    'image/png': 'PNG',
+    'image/gif': 'GIF',
+    'image/bmp': 'BMP',
+    'image/webp': 'WEBP'
+}
+MAX_UPLOAD_BYTES = 1 * 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+# (workers, timeout) from IMAGE_WORKERS/IMAGE_TIMEOUT, read once when the pool is first used.
+_settings = None
+# Caps in-flight jobs so a burst of uploads queues here instead of piling up in the pool.
+_slots = None
+
+
+class ImagePipelineBusy(Exception):
+    pass
+
+
+def variant_formats():
+    # Best compression first; JPEG is always last so every client has a fallback.
+    Image.init()
+    formats = []
+    if 'AVIF' in Image.SAVE:
+        formats.append('AVIF')
+    if 'WEBP' in Image.SAVE and features.check('webp'):
+        formats.append('WEBP')
+    formats.append('JPEG')
+    return formats
+
+
+def _decode(data):
+    img = Image.open(io.BytesIO(data))
+    # A full decode rejects truncated or corrupt files, so no separate verify() pass is needed.
+    img.load()
+    return img
+
+
+def _encode_variants(img):
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+    variants = []
+    for width in VARIANT_WIDTHS:
+        if width >= img.width:
+            continue
+        height = max(1, round(img.height * width / img.width))
+        resized = img.resize((width, height), Image.LANCZOS)
+        for image_format in variant_formats():
+            frame = resized.convert('RGB') if image_format == 'JPEG' else resized
+            output = io.BytesIO()
+            frame.save(output, format=image_format, quality=VARIANT_QUALITY[image_format])
+            variants.append((width, FORMAT_MIMETYPES[image_format], output.getvalue()))
+    # The source width again in each modern format, for requests without ?w= or wider than
+    # every resize. There is no JPEG at this width: the original serves those clients.
+    for image_format in variant_formats():
+        if image_format == 'JPEG':
+            continue
+        output = io.BytesIO()
+        img.save(output, format=image_format, quality=VARIANT_QUALITY[image_format])
+        variants.append((img.width, FORMAT_MIMETYPES[image_format], output.getvalue()))
+    return variants
+
+
+def build_variants(data):
+    """Encode ``data`` at each of VARIANT_WIDTHS in every supported format.
+
+    Widths at or above the source width are skipped; the source width itself
+    is encoded in the modern formats only, since the original already covers
+    JPEG clients. Returns ``(width, mimetype, bytes)`` tuples.
+    """
+    return _encode_variants(_decode(data))
+
+
+def encode_upload(data, mimetype):
+    """Decode an upload once, re-encode it for storage and build its variants.
+
+    Returns ``(image_data, image_mimetype, variants)``; the mimetype always
+    matches the stored bytes, falling back to JPEG for unlisted formats.
+    """
+    img = _decode(data)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    image_format = UPLOAD_FORMATS.get(mimetype, 'JPEG')
+    output = io.BytesIO()
+    img.save(output, format=image_format, quality=85 if image_format == 'JPEG' else None)
+    image_mimetype = mimetype if mimetype in UPLOAD_FORMATS else 'image/jpeg'
+    return output.getvalue(), image_mimetype, _encode_variants(img)
+
+
+def _pool_settings():
+    global _settings, _slots
+    with _executor_lock:
+        if _settings is None:
+            # IMAGE_WORKERS=0 encodes inline, for hosts where worker processes are unavailable.
+            workers = current_app.config.get('IMAGE_WORKERS', os.cpu_count() or 1)
+            _settings = (workers, current_app.config.get('IMAGE_TIMEOUT', 30))
+            _slots = threading.BoundedSemaphore(max(workers, 1) * 2)
+        return _settings
+
+
+def _get_executor(workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn keeps workers free of locks and connections held by the web process.
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def run_in_pool(fn, *args):
+    """Run CPU-bound image work in the worker pool and wait for its result.
+
+    The caller blocks without holding the GIL, so other request threads keep
+    running while encodes use every core. Raises ImagePipelineBusy when the
+    pool is saturated for longer than IMAGE_TIMEOUT.
+    """
+    workers, timeout = _pool_settings()
+    if workers <= 0:
+        return fn(*args)
+    if not _slots.acquire(timeout=timeout):
+        raise ImagePipelineBusy('Image processing is busy, try again shortly')
+    try:
+        try:
+            future = _get_executor(workers).submit(fn, *args)
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            logging.error(f"Image worker pool unavailable, processing inline: {str(e)}")
+            _reset_executor()
+            return fn(*args)
+        try:
+            return future.result(timeout=timeout)
+        except BrokenProcessPool:
+            # A worker died mid-encode; start a fresh pool for the next upload.
+            _reset_executor()
+            raise
+    finally:
+        _slots.release()
+
+
+def read_upload(image):
+    # Bounded read: the size cap holds even when the client omits Content-Length.
+    data = image.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        return None
+    return data
+
+
+def process_upload(data, mimetype):
+    from app.models import ImageVariant
+    image_data, image_mimetype, variants = run_in_pool(encode_upload, data, mimetype)
+    return image_data, image_mimetype, [ImageVariant(width=w, mimetype=m, size=len(b), data=b) for w, m, b in variants]
+
+
+def make_variants(data):
+    from app.models import ImageVariant
+    return [ImageVariant(width=w, mimetype=m, size=len(b), data=b) for w, m, b in run_in_pool(build_variants, data)]
+
+
+def accepted_image_types(accept_mimetypes):
+    # Only types the client names explicitly count: */* alone must not yield AVIF/WebP.
+    return {value for value, quality in accept_mimetypes if quality > 0 and value.startswith('image/')}
+
+
+def choose_variant(query, width, accept_mimetypes):
+    """Pick the variant best matching ``?w=`` and the Accept header.
+
+    ``query`` is an ImageVariant query already filtered to one image. The
+    smallest width covering the request wins, then the best accepted format.
+    Without ``?w=``, or when it is wider than every resize, the full-width
+    encode in the best accepted format stands in for the original. Only
+    metadata is read: returns ``(id, width, mimetype)``, or ``None`` to serve
+    the original.
+    """
+    from app.models import ImageVariant
+    preference = [FORMAT_MIMETYPES[f] for f in variant_formats()]
+    accepted = (accepted_image_types(accept_mimetypes) | {'image/jpeg'}) & set(preference)
+    rows = query.with_entities(ImageVariant.id, ImageVariant.width, ImageVariant.mimetype).all()
+    # Full-width encodes are the only widths without a JPEG; images encoded before they existed have none.
+    full_widths = {r.width for r in rows} - {r.width for r in rows if r.mimetype == 'image/jpeg'}
+    candidates = [c for c in rows if c.mimetype in accepted]
+    target = None
+    if width:
+        target = next((w for w in sorted({c.width for c in candidates}) if w >= width), None)
+    if target is None:
+        target = max(full_widths, default=None)
+    return min((c for c in candidates if c.width == target), key=lambda c: preference.index(c.mimetype), default=None)
+
+
+def variant_data(variant_id):
+    from app.models import ImageVariant
+    return db.session.query(ImageVariant.data).filter_by(id=variant_id).scalar()
+
+
+@click.command('build-image-variants')
+@click.option('--force', is_flag=True, help='Rebuild variants that already exist.')
+@with_appcontext
+def build_variants_command(force):
+    """Generate responsive variants for stored blog and content images."""
+    from app.models import BlogPost, Content
+    built = 0
+    for model in (BlogPost, Content):
+        ids = [row.id for row in db.session.query(model.id).filter(model.image_hash.isnot(None))]
+        for id in ids:
+            owner = model.query.options(db.undefer(model.image_data)).get(id)
+            if owner.variants and not force:
+                continue
+            try:
+                owner.variants = make_variants(owner.image_data)
+                db.session.commit()
+                built += 1
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Error building variants for {model.__tablename__} {id}: {str(e)}")
+            db.session.expunge_all()
+    click.echo(f"Built image variants for {built} images")
@@ -0,0 +1,192 @@
+from app import db, cache
+from app.models import BlogPost, Like
+from app.dialect import insert_ignore
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from datetime import datetime
+import atexit
+import logging
+import threading
+import time
+
+
+class PostNotFound(Exception):
+    pass
+
+
+def toggle_now(post_id, ip_address):
+    """Toggle one like with a DELETE, then an INSERT ... ON CONFLICT DO NOTHING.
+
+    The counter only moves by the rows those statements actually touched, so
+    concurrent clicks can neither duplicate a like nor skew like_count.
+    Returns ``(liked, like_count)``.
+    """
+    try:
+        removed = db.session.execute(
+            db.delete(Like).where(Like.post_id == post_id, Like.ip_address == ip_address)
+        ).rowcount
+        if removed:
+            liked, like_count = False, BlogPost.bump_counter(post_id, 'like_count', -removed)
+        else:
+            inserted = db.session.execute(
+                insert_ignore(Like, {'post_id': post_id, 'ip_address': ip_address, 'created_at': datetime.utcnow()},
+                              ['post_id', 'ip_address'])
+            ).rowcount
+            liked, like_count = True, BlogPost.bump_counter(post_id, 'like_count', inserted)
+        if like_count is None:
+            raise PostNotFound(post_id)
+        db.session.commit()
+    except (IntegrityError, PostNotFound):
+        db.session.rollback()
+        raise PostNotFound(post_id)
+    return liked, like_count
+
+
+class LikeBuffer:
+    """Optional write-behind buffer that coalesces like toggles per (post, IP).
+
+    Only the final state of each pair is written, in batched statements at
+    most every LIKE_FLUSH_INTERVAL seconds or LIKE_FLUSH_SIZE pairs. Counters
+    are adjusted by the rows each batch actually changed, so they stay exact
+    even when several workers buffer the same post.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LIKE_WRITE_BEHIND', False)
+        self.interval = app.config.get('LIKE_FLUSH_INTERVAL', 2.0)
+        self.size = app.config.get('LIKE_FLUSH_SIZE', 500)
+        self.app = app
+        if self.enabled:
+            threading.Thread(target=self._run, name='like-flusher', daemon=True).start()
+            atexit.register(self._flush_in_context)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing buffered likes: {str(e)}")
+
+    def _pending_delta(self, post_id):
+        return sum(1 if e['liked'] else -1 for (p, _), e in self._pending.items() if p == post_id)
+
+    def pending_delta(self, post_id):
+        with self._lock:
+            return self._pending_delta(post_id)
+
+    def pending_state(self, post_id, ip_address):
+        with self._lock:
+            entry = self._pending.get((post_id, ip_address))
+            return None if entry is None else entry['liked']
+
+    def toggle(self, post_id, ip_address):
+        # One indexed read gives the stored count, the stored state and the 404 check.
+        exists = db.session.query(Like.id).filter_by(post_id=post_id, ip_address=ip_address).exists()
+        row = db.session.query(BlogPost.like_count, exists).filter(BlogPost.id == post_id).first()
+        if row is None:
+            raise PostNotFound(post_id)
+        stored_liked = row[1]
+        key = (post_id, ip_address)
+        with self._lock:
+            entry = self._pending.get(key)
+            liked = not (entry['liked'] if entry else stored_liked)
+            if liked == stored_liked:
+                # Toggled back to what the database already holds: nothing to write.
+                self._pending.pop(key, None)
+            else:
+                self._pending[key] = {'liked': liked}
+            due = len(self._pending) >= self.size or time.time() - self._last_flush >= self.interval
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing buffered likes: {str(e)}")
+        # Count after any flush, and under the lock so no batch is half way between
+        # the buffer and like_count while we add the two up.
+        with self._lock:
+            stored_count = db.session.query(BlogPost.like_count).filter(BlogPost.id == post_id).scalar()
+            return liked, (stored_count or 0) + self._pending_delta(post_id)
+
+    def discard_post(self, post_id):
+        """Forget buffered toggles for a deleted post; they could never be written."""
+        with self._lock:
+            for key in [key for key in self._pending if key[0] == post_id]:
+                del self._pending[key]
+
+    def _live_posts(self, post_ids):
+        return {id for (id,) in db.session.query(BlogPost.id).filter(BlogPost.id.in_(post_ids))}
+
+    def _write(self, entries):
+        adds = [{'post_id': p, 'ip_address': ip, 'created_at': datetime.utcnow()} for (p, ip), e in entries.items() if e['liked']]
+        removes = [(p, ip) for (p, ip), e in entries.items() if not e['liked']]
+        deltas = Counter()
+        for start in range(0, len(adds), self.size):
+            inserted = db.session.execute(
+                insert_ignore(Like, adds[start:start + self.size], ['post_id', 'ip_address']).returning(Like.post_id)
+            ).scalars()
+            deltas.update(inserted)
+        for start in range(0, len(removes), self.size):
+            deleted = db.session.execute(
+                db.delete(Like)
+                .where(tuple_(Like.post_id, Like.ip_address).in_(removes[start:start + self.size]))
+                .returning(Like.post_id)
+            ).scalars()
+            deltas.subtract(deleted)
+        return deltas
+
+    def _write_each(self, entries):
+        # Row by row, each in a savepoint, so one row that can never be written
+        # (its post was deleted meanwhile) is dropped instead of blocking the rest.
+        deltas = Counter()
+        for key, entry in entries.items():
+            try:
+                with db.session.begin_nested():
+                    deltas.update(self._write({key: entry}))
+            except IntegrityError as e:
+                logging.error(f"Dropping buffered like {key}: {str(e)}")
+        return deltas
+
+    def flush(self):
+        # The lock is held until the batch is committed, so readers never see it
+        # gone from the buffer but not yet in like_count.
+        with self._lock:
+            entries, self._pending = self._pending, {}
+            self._last_flush = time.time()
+            if not entries:
+                return 0
+            try:
+                live = self._live_posts({post_id for post_id, _ in entries})
+                writable = {key: entry for key, entry in entries.items() if key[0] in live}
+                try:
+                    deltas = self._write(writable)
+                except IntegrityError:
+                    db.session.rollback()
+                    deltas = self._write_each(writable)
+                for post_id, delta in deltas.items():
+                    if delta:
+                        BlogPost.bump_counter(post_id, 'like_count', delta)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Keep the batch for the next flush: the failure was not about the rows.
+                self._pending = entries
+                raise
+        if deltas:
+            cache.invalidate('blog:list', *(f'blog:post:{post_id}' for post_id in deltas))
+        logging.debug(f"Flushed {len(entries)} buffered likes across {len(deltas)} posts")
+        return len(entries)
+
+
+like_buffer = LikeBuffer()
@@ -0,0 +1,103 @@
+from flask import Response, request, jsonify, stream_with_context
+from app.pagination import seek_page
+from datetime import datetime, timedelta
+import csv
+import io
+import json
+import logging
+
+STREAM_BATCH_SIZE = 500
+MAX_PER_PAGE = 100
+
+
+def _truthy(value):
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+
+def parse_date(value, end_of_day=False):
+    """Parse an ISO 8601 date or datetime query arg; raises ValueError."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # A bare date as the upper bound means "through the end of that day".
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def stream_json(query, serialize, key=None, batch_size=STREAM_BATCH_SIZE):
+    """Stream ``query`` as a JSON array (wrapped in ``{key: [...]}`` when given).
+
+    Rows come off a server-side cursor ``batch_size`` at a time and each batch
+    is written out before the next is fetched, so memory stays flat however
+    large the table grows.
+    """
+    def generate():
+        yield '{%s: [' % json.dumps(key) if key else '['
+        first = True
+        try:
+            for row in query.yield_per(batch_size):
+                chunk = json.dumps(serialize(row), default=str)
+                yield chunk if first else ',' + chunk
+                first = False
+        except Exception as e:
+            # Headers are already sent; a truncated body is the only signal left.
+            logging.error(f"Error streaming {request.path}: {str(e)}")
+            return
+        yield ']}' if key else ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def stream_csv(query, header, serialize, filename, batch_size=STREAM_BATCH_SIZE):
+    """Stream ``query`` as a CSV download, one chunk per ``batch_size`` rows."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        try:
+            for count, row in enumerate(query.yield_per(batch_size), 1):
+                writer.writerow(serialize(row))
+                if count % batch_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        except Exception as e:
+            logging.error(f"Error streaming {request.path}: {str(e)}")
+            return
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def list_response(query, serialize, key, bare=False, seek=None):
+    """Serve an admin listing in the shape the query args ask for.
+
+    ``?stream=1`` streams every row, ``?page=N&per_page=M`` returns one page
+    with totals, and anything else returns the whole list as before (a bare
+    array when ``bare`` is set, otherwise ``{key: [...]}``). Passing ``seek``
+    as ``(created_col, id_col)`` also enables ``?cursor=`` keyset pages.
+    """
+    if _truthy(request.args.get('stream')):
+        return stream_json(query, serialize, None if bare else key)
+    if seek is not None and 'cursor' in request.args:
+        limit = max(1, min(request.args.get('per_page', 50, type=int), MAX_PER_PAGE))
+        try:
+            rows, next_cursor = seek_page(query.order_by(None), *seek, request.args['cursor'], limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        return jsonify({key: [serialize(row) for row in rows], 'next_cursor': next_cursor}), 200
+    if 'page' in request.args or 'per_page' in request.args:
+        page = request.args.get('page', 1, type=int)
+        per_page = max(1, min(request.args.get('per_page', 50, type=int), MAX_PER_PAGE))
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        return jsonify({
+            key: [serialize(row) for row in pagination.items],
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'current_page': pagination.page
+        }), 200
+    rows = [serialize(row) for row in query.all()]
+    return jsonify(rows if bare else {key: rows}), 200
@@ -0,0 +1,187 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+from app.models import NewsletterCampaign, NewsletterSubscription
+from app.throttle import Throttle
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.message import EmailMessage
+from email.policy import SMTP
+import click
+import logging
+import smtplib
+import threading
+import time
+
+# Campaigns a sender may pick up; 'sending' is only taken over with resume=True.
+SENDABLE_STATUSES = ('draft', 'paused', 'failed')
+
+
+class CampaignBusy(Exception):
+    pass
+
+
+class SMTPPool:
+    """Persistent SMTP connections, one per worker thread, reopened if the server drops them."""
+
+    def __init__(self, config):
+        self.config = config
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        config = self.config
+        smtp_class = smtplib.SMTP_SSL if config.get('MAIL_USE_SSL') else smtplib.SMTP
+        conn = smtp_class(config.get('MAIL_SERVER', 'localhost'), config.get('MAIL_PORT', 25), timeout=config.get('MAIL_TIMEOUT', 30))
+        if config.get('MAIL_USE_TLS'):
+            conn.starttls()
+        if config.get('MAIL_USERNAME'):
+            conn.login(config['MAIL_USERNAME'], config.get('MAIL_PASSWORD'))
+        with self._lock:
+            self._opened.append(conn)
+        return conn
+
+    def send(self, sender, recipient, message):
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            try:
+                conn.sendmail(sender, [recipient], message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def close(self):
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+
+def render(campaign, sender):
+    """Build the campaign once; each recipient only gets a To header prepended."""
+    message = EmailMessage()
+    message['Subject'] = campaign.subject
+    message['From'] = sender
+    message.set_content(campaign.body_text)
+    if campaign.body_html:
+        message.add_alternative(campaign.body_html, subtype='html')
+    return message.as_bytes(policy=SMTP)
+
+
+def send_campaign(campaign_id, max_seconds=None, resume=False):
+    """Deliver a campaign to every subscriber after its checkpoint.
+
+    Subscribers are read in id order, ``MAIL_BATCH_SIZE`` at a time, and each
+    chunk is sent over ``MAIL_CONNECTIONS`` pooled connections within the
+    ``MAIL_RATE_PER_MINUTE`` limit. The checkpoint and counters are committed
+    after every chunk, so a crash resends at most one chunk. With
+    ``max_seconds`` the run stops at the next chunk boundary past the budget
+    and leaves the campaign 'paused' for the next call to pick up.
+    """
+    config = current_app.config
+    statuses = SENDABLE_STATUSES + (('sending',) if resume else ())
+    claimed = db.session.execute(
+        db.update(NewsletterCampaign)
+        .where(NewsletterCampaign.id == campaign_id, NewsletterCampaign.status.in_(statuses))
+        .values(status='sending', started_at=db.func.coalesce(NewsletterCampaign.started_at, datetime.utcnow()))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        raise CampaignBusy(campaign_id)
+
+    campaign = db.session.get(NewsletterCampaign, campaign_id)
+    sender = config.get('MAIL_DEFAULT_SENDER')
+    message = render(campaign, sender)
+    batch_size = config.get('MAIL_BATCH_SIZE', 200)
+    throttle = Throttle(config.get('MAIL_RATE_PER_MINUTE', 600) / 60.0)
+    pool = SMTPPool(config)
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+
+    def deliver(email):
+        throttle.wait()
+        try:
+            pool.send(sender, email, f'To: {email}\r\n'.encode('utf-8') + message)
+            return True
+        except (smtplib.SMTPException, OSError) as e:
+            logging.error(f"Campaign {campaign_id}: delivery to {email} failed: {str(e)}")
+            return False
+
+    try:
+        with ThreadPoolExecutor(max_workers=config.get('MAIL_CONNECTIONS', 4), thread_name_prefix='mailer') as executor:
+            while True:
+                rows = (db.session.query(NewsletterSubscription.id, NewsletterSubscription.email)
+                        .filter(NewsletterSubscription.id > campaign.last_subscriber_id)
+                        .order_by(NewsletterSubscription.id).limit(batch_size).all())
+                if not rows:
+                    campaign.status = 'sent'
+                    campaign.finished_at = datetime.utcnow()
+                    db.session.commit()
+                    break
+                results = list(executor.map(deliver, [row.email for row in rows]))
+                sent = sum(results)
+                if not sent:
+                    # Nothing in the chunk went out: the server is down, not the addresses.
+                    # Keep the checkpoint so the next run retries this chunk.
+                    campaign.status = 'failed'
+                    db.session.commit()
+                    break
+                campaign.last_subscriber_id = rows[-1].id
+                campaign.sent_count += sent
+                campaign.failed_count += len(results) - sent
+                db.session.commit()
+                logging.info(f"Campaign {campaign_id}: {campaign.sent_count} sent, {campaign.failed_count} failed")
+                if deadline and time.monotonic() >= deadline:
+                    campaign.status = 'paused'
+                    db.session.commit()
+                    break
+    except Exception:
+        db.session.rollback()
+        campaign.status = 'failed'
+        db.session.commit()
+        raise
+    finally:
+        pool.close()
+    return campaign
+
+
+def progress(campaign):
+    remaining = db.session.query(db.func.count(NewsletterSubscription.id)).filter(
+        NewsletterSubscription.id > campaign.last_subscriber_id
+    ).scalar()
+    return {
+        'id': campaign.id,
+        'subject': campaign.subject,
+        'status': campaign.status,
+        'sent_count': campaign.sent_count,
+        'failed_count': campaign.failed_count,
+        'remaining': 0 if campaign.status == 'sent' else remaining,
+        'created_at': campaign.created_at.isoformat() if campaign.created_at else None,
+        'started_at': campaign.started_at.isoformat() if campaign.started_at else None,
+        'finished_at': campaign.finished_at.isoformat() if campaign.finished_at else None
+    }
+
+
+@click.command('send-newsletter')
+@click.argument('campaign_id', type=int)
+@click.option('--resume', is_flag=True, help="Take over a campaign left in 'sending' by a crashed run.")
+@with_appcontext
+def send_newsletter_command(campaign_id, resume):
+    """Send a newsletter campaign to every subscriber, resuming from its checkpoint.
+
+    For a local dry run, point MAIL_SERVER/MAIL_PORT at a debugging SMTP
+    server such as ``python -m aiosmtpd -n -l localhost:1025``.
+    """
+    try:
+        campaign = send_campaign(campaign_id, resume=resume)
+    except CampaignBusy:
+        raise click.ClickException(f"Campaign {campaign_id} is missing, already sent or being sent (use --resume after a crash)")
+    click.echo(f"Campaign {campaign_id} {campaign.status}: {campaign.sent_count} sent, {campaign.failed_count} failed")
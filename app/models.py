@@ -1,5 +1,8 @@
 from app import db
+from app.summary import EXCERPT_LENGTH, make_excerpt, reading_minutes
+from sqlalchemy import event
 from datetime import datetime
+import hashlib
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -7,6 +10,8 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(50), nullable=False)
+    # Signed into every token; bumping it invalidates tokens issued before the change.
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Content(db.Model):
@@ -14,16 +19,29 @@ class Content(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     body = db.Column(db.Text, nullable=False)
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 1), nullable=True)
+    reading_time = db.Column(db.Integer, nullable=True)
     category = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    image_data = db.Column(db.LargeBinary, nullable=True)
+    image_data = db.deferred(db.Column(db.LargeBinary, nullable=True))
     image_mimetype = db.Column(db.String(50), nullable=True)
+    image_hash = db.Column(db.String(64), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user = db.relationship('User', backref='contents')
+    variants = db.relationship('ImageVariant', backref='content', lazy=True, cascade='all, delete-orphan')
+
+    @property
+    def has_image(self):
+        return self.image_hash is not None
 
 class Donation(db.Model):
     __tablename__ = 'donation'
+    __table_args__ = (
+        db.Index('ix_donation_created_at_id', 'created_at', 'id'),
+        db.Index('ix_donation_frequency_created_at_id', 'frequency', 'created_at', 'id'),
+        db.Index('ux_donation_paystack_transaction_ref', 'paystack_transaction_ref', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     amount = db.Column(db.Float, nullable=False)
@@ -31,14 +49,61 @@ class Donation(db.Model):
     frequency = db.Column(db.String(50), nullable=False)
     recognition = db.Column(db.String(50), nullable=False)
     paystack_transaction_ref = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', server_default='pending')
+    verified_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Backs the case-insensitive email filter on the admin donations listing.
+db.Index('ix_donation_email_lower', db.func.lower(Donation.email))
+
+class DonationRollup(db.Model):
+    __tablename__ = 'donation_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('period', 'bucket', 'frequency', 'recognition', 'status', name='uq_donation_rollup_bucket'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)
+    bucket = db.Column(db.Date, nullable=False)
+    frequency = db.Column(db.String(50), nullable=False)
+    recognition = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', server_default='pending')
+    total = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
 class NewsletterSubscription(db.Model):
     __tablename__ = 'newsletter_subscription'
+    __table_args__ = (
+        db.Index('ix_newsletter_subscription_subscribed_at_id', 'subscribed_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     subscribed_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Subscribers are unique by normalized address, whichever path wrote the row.
+db.Index('ux_newsletter_subscription_email_lower', db.func.lower(NewsletterSubscription.email), unique=True)
+
+class NewsletterCampaign(db.Model):
+    __tablename__ = 'newsletter_campaign'
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    body_html = db.Column(db.Text, nullable=True)
+    body_text = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='draft', server_default='draft')
+    # Highest subscriber id whose chunk has been handed to SMTP; sending resumes after it.
+    last_subscriber_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    sent_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    failed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_token'
+    jti = db.Column(db.String(36), primary_key=True)
+    # Rows are only needed until the token would have expired anyway.
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 class ContactMessage(db.Model):
     __tablename__ = 'contact_message'
     id = db.Column(db.Integer, primary_key=True)
@@ -54,21 +119,52 @@ class ContactMessage(db.Model):
 
 class BlogPost(db.Model):
     __tablename__ = 'blog_post'
+    __table_args__ = (
+        db.Index('ix_blog_post_created_at_id', 'created_at', 'id'),
+        db.Index('ix_blog_post_category_created_at_id', 'category', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 1), nullable=True)
+    reading_time = db.Column(db.Integer, nullable=True)
     category = db.Column(db.String(100), nullable=False)
-    image_data = db.Column(db.LargeBinary)
+    image_data = db.deferred(db.Column(db.LargeBinary))
     image_mimetype = db.Column(db.String(100))
+    image_hash = db.Column(db.String(64))
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author = db.relationship('User', backref=db.backref('posts', lazy=True))
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='post', lazy=True, cascade='all, delete-orphan')
+    variants = db.relationship('ImageVariant', backref='post', lazy=True, cascade='all, delete-orphan')
+
+    @classmethod
+    def bump_counter(cls, post_id, column, delta):
+        # Single UPDATE so concurrent writers never lose an increment; updated_at is
+        # pinned so engagement doesn't look like an edit to the post itself.
+        # Returns the new value, or None if the post doesn't exist.
+        counter = getattr(cls, column)
+        return db.session.execute(
+            db.update(cls)
+            .where(cls.id == post_id)
+            .values({counter: counter + delta, cls.updated_at: cls.updated_at})
+            .returning(counter)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+
+    @property
+    def has_image(self):
+        return self.image_hash is not None
 
 class Comment(db.Model):
     __tablename__ = 'comment'
+    __table_args__ = (
+        db.Index('ix_comment_post_id_created_at_id', 'post_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('blog_post.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -79,6 +175,9 @@ class Comment(db.Model):
 
 class Like(db.Model):
     __tablename__ = 'like'
+    __table_args__ = (
+        db.Index('ux_like_post_id_ip_address', 'post_id', 'ip_address', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('blog_post.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -86,6 +185,17 @@ class Like(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref=db.backref('likes', lazy=True))
 
+class ImageVariant(db.Model):
+    __tablename__ = 'image_variant'
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_post.id'), nullable=True, index=True)
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id'), nullable=True, index=True)
+    width = db.Column(db.Integer, nullable=False)
+    mimetype = db.Column(db.String(50), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Partnership(db.Model):
     __tablename__ = 'partnership'
     id = db.Column(db.Integer, primary_key=True)
@@ -108,4 +218,22 @@ class Testimonial(db.Model):
     name = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
     location = db.Column(db.String(100), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def _sync_image_hash(target, value, oldvalue, initiator):
+    # image_data is deferred, so JSON views test image_hash instead of the blob.
+    target.image_hash = hashlib.sha256(value).hexdigest() if value else None
+
+
+def _sync_summary(target, value, oldvalue, initiator):
+    # Computed once per write so list views never have to ship or scan the full text.
+    target.excerpt = make_excerpt(value)
+    target.reading_time = reading_minutes(value)
+
+
+event.listen(BlogPost.image_data, 'set', _sync_image_hash)
+event.listen(Content.image_data, 'set', _sync_image_hash)
+event.listen(BlogPost.content, 'set', _sync_summary)
+event.listen(Content.body, 'set', _sync_summary)
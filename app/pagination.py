@@ -0,0 +1,47 @@
+from sqlalchemy import tuple_
+from datetime import datetime
+import base64
+import binascii
+import json
+
+
+def encode_cursor(created_at, id):
+    raw = json.dumps([created_at.isoformat(), id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+
+def seek_page(query, created_col, id_col, cursor, limit):
+    """Return one newest-first page of ``query`` starting after ``cursor``.
+
+    Rows are ordered on ``(created_col, id_col)`` and the cursor seeks straight
+    to its position, so page N costs the same as page 1. Returns the rows and
+    the cursor for the following page (``None`` on the last page).
+    """
+    query = query.order_by(created_col.desc(), id_col.desc())
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, last_id))
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def load_in_order(query, id_col, ids):
+    """Fetch full rows for ``ids`` and return them in the same order."""
+    if not ids:
+        return []
+    rows = {getattr(row, id_col.key): row for row in query.filter(id_col.in_(ids)).all()}
+    return [rows[id] for id in ids if id in rows]
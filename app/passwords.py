@@ -0,0 +1,107 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from app import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+import click
+import os
+import threading
+import time
+
+_executor = None
+_executor_lock = threading.Lock()
+# (workers, queue, timeout) from app.config, read on first use.
+_settings = None
+_slots = None
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def _pool_settings():
+    global _settings, _executor, _slots
+    with _executor_lock:
+        if _settings is None:
+            # bcrypt releases the GIL, so one thread per core hashes in parallel with request threads.
+            # HASH_WORKERS=0 hashes inline on the request thread.
+            workers = current_app.config.get('HASH_WORKERS', os.cpu_count() or 1)
+            # Logins allowed to wait for a worker; beyond this they get a 503 instead of a growing queue.
+            queue = current_app.config.get('HASH_QUEUE', max(workers, 1) * 8)
+            _settings = (workers, queue, current_app.config.get('HASH_TIMEOUT', 5))
+            if workers > 0:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+                _slots = threading.BoundedSemaphore(workers + queue)
+        return _settings
+
+
+def _run(fn, *args):
+    workers, _, timeout = _pool_settings()
+    if workers <= 0:
+        return fn(*args)
+    if not _slots.acquire(timeout=timeout):
+        raise HashingBusy('Too many sign-ins in progress, try again shortly')
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def current_rounds():
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+
+def hash_cost(pw_hash):
+    # Modular crypt format: $2b$<cost>$<salt+hash>
+    try:
+        return int(pw_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def hash_password(password, rounds=None):
+    rounds = rounds or current_rounds()
+    return _run(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+
+
+def check_password(pw_hash, password):
+    return _run(bcrypt.check_password_hash, pw_hash, password)
+
+
+def needs_rehash(pw_hash):
+    return hash_cost(pw_hash) != current_rounds()
+
+
+@click.command('bench-password-hashing')
+@click.option('--rounds', type=int, default=None, help='bcrypt cost to measure (default: BCRYPT_LOG_ROUNDS).')
+@click.option('--seconds', default=5.0, show_default=True, help='How long to run.')
+@click.option('--threads', type=int, default=None, help='Concurrent callers (default: HASH_WORKERS).')
+@with_appcontext
+def bench_password_hashing_command(rounds, seconds, threads):
+    """Measure password checks per second through the hashing pool."""
+    rounds = rounds or current_rounds()
+    workers = max(_pool_settings()[0], 1)
+    threads = threads or workers
+    pw_hash = bcrypt.generate_password_hash('benchmark-password', rounds).decode('utf-8')
+    done = [0] * threads
+    deadline = time.monotonic() + seconds
+
+    def caller(index):
+        while time.monotonic() < deadline:
+            check_password(pw_hash, 'benchmark-password')
+            done[index] += 1
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=caller, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+    total = sum(done)
+    if not total:
+        raise click.ClickException('No checks completed; raise --seconds')
+    cores = os.cpu_count() or 1
+    click.echo(
+        f"cost {rounds}: {total} checks in {elapsed:.2f}s with {threads} callers on {workers} workers, "
+        f"{total / elapsed:.1f} logins/s, {total / elapsed / cores:.1f} logins/s per core ({cores} cores)"
+    )
@@ -0,0 +1,201 @@
+from app import db, paystack
+from app.models import Donation
+from app.cache import MemoryBackend
+from app.paystack import PaystackError
+from app.throttle import Throttle
+from flask import current_app
+from flask.cli import with_appcontext
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from decimal import Decimal
+import click
+import logging
+import threading
+import time
+
+PENDING = 'pending'
+SUCCESS = 'success'
+# Paystack reported success for a different amount or currency than the donation was made for.
+AMOUNT_MISMATCH = 'amount_mismatch'
+# Paystack transaction statuses that will not change again on their own.
+TERMINAL_STATUSES = ('success', 'failed', 'abandoned', 'reversed')
+
+
+def to_kobo(amount):
+    """Naira (or other major unit) to the integer minor unit Paystack charges in.
+
+    Goes through the decimal string so 1.13 is 113, not the 112 that
+    ``int(1.13 * 100)`` gives; used both when charging and when checking.
+    """
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1')))
+
+
+def record_transaction(data):
+    """Apply a Paystack transaction object to its donation and return the donation.
+
+    ``data`` is the ``data`` member of a webhook event or a verify response.
+    Idempotent: replaying the same event changes nothing, and a successful
+    donation only ever moves on to ``reversed``. A success whose amount (in
+    kobo) or currency differs from the donation is recorded as
+    ``amount_mismatch`` and never counts as paid. Returns None for unknown
+    references. The caller commits.
+    """
+    reference = data.get('reference')
+    if not reference:
+        return None
+    query = Donation.query.filter_by(paystack_transaction_ref=reference)
+    status = data.get('status')
+    if status not in TERMINAL_STATUSES:
+        return query.first()
+    donation = query.with_for_update().first()
+    if donation is None:
+        logging.warning(f"Paystack transaction {reference} has no matching donation")
+        return None
+    if donation.status == status or (donation.status in (SUCCESS, AMOUNT_MISMATCH) and status != 'reversed'):
+        return donation
+    if status == SUCCESS and not _amount_matches(donation, data):
+        logging.warning(
+            f"Paystack reported {data.get('amount')} {data.get('currency')} for {reference}, "
+            f"donation was {donation.amount}; not confirming it"
+        )
+        status = AMOUNT_MISMATCH
+    donation.status = status
+    donation.verified_at = datetime.utcnow()
+    return donation
+
+
+def _amount_matches(donation, data):
+    currency = current_app.config.get('PAYSTACK_CURRENCY', 'NGN')
+    if data.get('currency') and data['currency'].upper() != currency.upper():
+        return False
+    try:
+        return int(data.get('amount')) == to_kobo(donation.amount)
+    except (TypeError, ValueError):
+        return False
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one; the rest wait for its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+
+_verify_flight = SingleFlight()
+_recent_checks = MemoryBackend(max_entries=4096)
+
+
+def refresh_status(reference):
+    """Ask Paystack about a donation that is still pending locally and return its status.
+
+    For when the callback page beats the webhook. Concurrent callers in this
+    process share a single upstream call, a pending answer is reused for
+    PAYSTACK_RECHECK_SECONDS, and a terminal one is stored on the donation so every
+    later verify is a single indexed read.
+    """
+    if _recent_checks.get(reference):
+        return PENDING
+
+    def check():
+        response = paystack.verify_transaction(reference)
+        donation = record_transaction(response.get('data') or {}) if response.get('status') else None
+        db.session.commit()
+        status = donation.status if donation else PENDING
+        if status == PENDING:
+            # How long a "still pending" answer from Paystack is reused before asking again.
+            _recent_checks.set(reference, True, current_app.config.get('PAYSTACK_RECHECK_SECONDS', 5))
+        return status
+
+    try:
+        return _verify_flight.do(reference, check)
+    except PaystackError:
+        return PENDING
+
+
+def reconcile_pending(older_than=timedelta(minutes=30), limit=None, workers=8, rate=10, batch_size=100):
+    """Verify pending donations against Paystack and store the outcomes.
+
+    Upstream calls run on a bounded thread pool behind a shared rate limit;
+    results are applied from this thread and committed every ``batch_size``
+    donations. Returns a summary with counts per status and throughput.
+    """
+    cutoff = datetime.utcnow() - older_than
+    throttle = Throttle(rate)
+
+    def fetch(reference):
+        throttle.wait()
+        return reference, paystack.verify_transaction(reference)
+
+    counts = Counter()
+    started = time.monotonic()
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as executor:
+        while limit is None or counts['checked'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - counts['checked'])
+            rows = (db.session.query(Donation.id, Donation.paystack_transaction_ref)
+                    .filter(Donation.status == PENDING, Donation.created_at < cutoff, Donation.id > last_id)
+                    .order_by(Donation.id).limit(size).all())
+            if not rows:
+                break
+            last_id = rows[-1].id
+            futures = [executor.submit(fetch, row.paystack_transaction_ref) for row in rows]
+            for future in as_completed(futures):
+                counts['checked'] += 1
+                try:
+                    reference, response = future.result()
+                except PaystackError:
+                    counts['errors'] += 1
+                    continue
+                donation = record_transaction(response.get('data') or {}) if response.get('status') else None
+                counts[donation.status if donation else PENDING] += 1
+            db.session.commit()
+            logging.info(f"Reconciled {counts['checked']} donations so far: {dict(counts)}")
+    elapsed = time.monotonic() - started
+    checked, errors = counts.pop('checked', 0), counts.pop('errors', 0)
+    return {
+        'checked': checked,
+        'errors': errors,
+        'statuses': dict(counts),
+        'seconds': round(elapsed, 2),
+        'per_second': round(checked / elapsed, 2) if elapsed else 0
+    }
+
+
+@click.command('reconcile-donations')
+@click.option('--older-than', default=30, show_default=True, help='Only donations pending for at least this many minutes.')
+@click.option('--limit', type=int, default=None, help='Stop after this many donations.')
+@click.option('--workers', default=8, show_default=True, help='Concurrent Paystack requests.')
+@click.option('--rate', default=10.0, show_default=True, help='Maximum Paystack requests per second.')
+@click.option('--batch-size', default=100, show_default=True, help='Donations per commit.')
+@with_appcontext
+def reconcile_donations_command(older_than, limit, workers, rate, batch_size):
+    """Verify every stale pending donation against Paystack."""
+    summary = reconcile_pending(timedelta(minutes=older_than), limit, workers, rate, batch_size)
+    click.echo(
+        f"Checked {summary['checked']} donations in {summary['seconds']}s "
+        f"({summary['per_second']}/s), {summary['errors']} errors: {summary['statuses']}"
+    )
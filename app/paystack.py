@@ -0,0 +1,84 @@
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import quote
+import hashlib
+import hmac
+import logging
+import requests
+
+
+class PaystackError(Exception):
+    """Paystack could not be reached or sent back something that isn't JSON."""
+
+
+class PaystackClient:
+    """Shared Paystack API client.
+
+    One ``requests.Session`` per process keeps TLS connections to Paystack
+    alive between requests. Every call has connect and read timeouts, and
+    connection failures plus 429/5xx answers to GETs are retried with
+    exponential backoff. POSTs are never retried once they reached Paystack.
+    """
+
+    def __init__(self, app=None):
+        self.session = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.base_url = app.config.get('PAYSTACK_BASE_URL', 'https://api.paystack.co').rstrip('/')
+        self.secret_key = app.config.get('PAYSTACK_SECRET_KEY')
+        self.timeout = (app.config.get('PAYSTACK_CONNECT_TIMEOUT', 3.05), app.config.get('PAYSTACK_READ_TIMEOUT', 10))
+        retries = Retry(
+            total=app.config.get('PAYSTACK_RETRIES', 3),
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET'}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=app.config.get('PAYSTACK_POOL_SIZE', 10), max_retries=retries)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        app.extensions['paystack'] = self
+
+    def verify_signature(self, body, signature):
+        """Check a webhook's ``x-paystack-signature`` (HMAC-SHA512 of the raw body)."""
+        if not self.secret_key or not signature:
+            return False
+        expected = hmac.new(self.secret_key.encode('utf-8'), body, hashlib.sha512).hexdigest()
+        # compare_digest refuses non-ASCII str, so compare bytes: a garbage header is a mismatch, not an error.
+        return hmac.compare_digest(expected.encode('ascii'), signature.encode('utf-8', 'surrogateescape'))
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(
+                method,
+                f'{self.base_url}{path}',
+                headers={'Authorization': f'Bearer {self.secret_key}'},
+                timeout=self.timeout,
+                **kwargs
+            )
+            # Paystack reports failures in the body ({"status": false, "message": ...}),
+            # so callers get the payload whatever the HTTP status was.
+            return response.json()
+        except requests.RequestException as e:
+            logging.error(f"Paystack {method} {path} failed: {str(e)}")
+            raise PaystackError(str(e))
+        except ValueError:
+            logging.error(f"Paystack {method} {path} returned non-JSON status {response.status_code}")
+            raise PaystackError(f'Unexpected response from Paystack (HTTP {response.status_code})')
+
+    def initialize_transaction(self, email, amount, callback_url=None, metadata=None, currency=None):
+        payload = {'email': email, 'amount': amount}
+        if currency:
+            payload['currency'] = currency
+        if callback_url:
+            payload['callback_url'] = callback_url
+        if metadata:
+            payload['metadata'] = metadata
+        return self._request('POST', '/transaction/initialize', json=payload)
+
+    def verify_transaction(self, reference):
+        return self._request('GET', f"/transaction/verify/{quote(reference, safe='')}")
@@ -0,0 +1,154 @@
+from flask import request, jsonify, make_response
+from collections import OrderedDict
+from functools import wraps
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """'5/minute' -> tokens per second."""
+    count, _, period = rate.partition('/')
+    return int(count) / PERIODS[period.strip()]
+
+
+class MemoryBuckets:
+    """Token buckets in this process only. Each worker counts its own requests."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBuckets:
+    """Token buckets in a local SQLite file, shared by every worker on the host."""
+
+    # Drop buckets idle for this long; any bucket refills well within it.
+    IDLE_SECONDS = 86400
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._next_prune = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_rate_bucket_updated ON rate_bucket (updated)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, capacity):
+        now = time.time()
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so concurrent workers cannot
+        # both read the same token count and spend it twice.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO rate_bucket (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            if now >= self._next_prune:
+                self._next_prune = now + self.PRUNE_INTERVAL
+                conn.execute('DELETE FROM rate_bucket WHERE updated < ?', (now - self.IDLE_SECONDS,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        self._connect().execute('DELETE FROM rate_bucket')
+
+
+class RateLimiter:
+    """Per-route, per-client token buckets applied with ``@limiter.limit``.
+
+    The check runs before the view body, so a rejected request never opens a
+    database session. Backend failures let the request through rather than
+    take the route down with the limiter.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+        try:
+            if kind == 'sqlite':
+                path = app.config.get('RATE_LIMIT_PATH') or os.path.join(app.instance_path, 'rate_limit.db')
+                self.backend = SQLiteBuckets(path)
+            elif kind == 'memory':
+                self.backend = MemoryBuckets(app.config.get('RATE_LIMIT_MAX_ENTRIES', 10000))
+            else:
+                self.backend = None
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Rate limiting disabled, backend {kind} failed to start: {str(e)}")
+            self.backend = None
+        app.extensions['rate_limiter'] = self
+
+    def client_ip(self):
+        # Behind a proxy, ProxyFix (PROXY_FIX_X_FOR) has already replaced remote_addr with
+        # the hop our proxy saw; the client-supplied left end of X-Forwarded-For is never used.
+        return request.remote_addr or 'unknown'
+
+    def limit(self, rate, burst=None):
+        """Allow ``rate`` (e.g. '5/minute') per client on this route, with bursts up to ``burst``."""
+        per_second = parse_rate(rate)
+        capacity = burst or max(1, int(per_second * 60))
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method == 'OPTIONS':
+                    return view(*args, **kwargs)
+                key = f'{request.endpoint}:{self.client_ip()}'
+                try:
+                    allowed, retry_after = self.backend.take(key, per_second, capacity)
+                except Exception as e:
+                    logging.error(f"Rate limit check failed for {request.path}: {str(e)}")
+                    return view(*args, **kwargs)
+                if allowed:
+                    return view(*args, **kwargs)
+                logging.warning(f"Rate limited {key}, retry in {retry_after:.1f}s")
+                response = make_response(jsonify({'error': 'Too many requests, please slow down'}), 429)
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,85 @@
+from flask import current_app
+from app import db
+from app.models import RevokedToken
+from app.dialect import insert_ignore
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+# Allowance for clock drift between workers when reading rows revoked since the last sync.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class RevocationList:
+    """Revoked token ids that have not expired yet, held in memory.
+
+    The ``revoked_token`` table is the shared record. Each process keeps the
+    live jtis in a dict and only reads rows revoked since its last sync, at
+    most every REVOCATION_SYNC_SECONDS, so a token check is normally a dict
+    lookup. Entries drop out once the token would have expired anyway, which
+    keeps the set as small as the number of recently revoked tokens.
+    """
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._next_sync = 0
+
+    def _sync(self):
+        now = datetime.utcnow()
+        query = db.session.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+        if self._synced_at is not None:
+            query = query.filter(RevokedToken.revoked_at >= self._synced_at - SYNC_OVERLAP)
+        rows = query.all()
+        with self._lock:
+            for jti, expires_at in rows:
+                self._revoked[jti] = expires_at
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+            self._synced_at = now
+            # How stale this process's copy of the revocation table may get. Revocations
+            # made here apply at once; ones made by other workers within this many seconds.
+            self._next_sync = time.monotonic() + current_app.config.get('REVOCATION_SYNC_SECONDS', 5)
+
+    def is_revoked(self, jti):
+        if time.monotonic() >= self._next_sync:
+            try:
+                self._sync()
+            except Exception as e:
+                # Keep answering from memory; the next check retries the sync.
+                logging.error(f"Revocation list sync failed: {str(e)}")
+        with self._lock:
+            return jti in self._revoked
+
+    def revoke(self, jti, expires):
+        """Record a token as revoked. ``expires`` is its ``exp`` claim. The caller commits.
+
+        Returns False when the token was already revoked, by this or any other
+        worker: the insert is a single conflict-ignoring statement, so of two
+        concurrent revocations exactly one wins.
+        """
+        expires_at = datetime.utcfromtimestamp(expires)
+        inserted = db.session.execute(
+            insert_ignore(RevokedToken, {'jti': jti, 'expires_at': expires_at, 'revoked_at': datetime.utcnow()}, ['jti'])
+        ).rowcount
+        with self._lock:
+            self._revoked[jti] = expires_at
+        # Expired rows can never match again; clearing them here keeps the table small.
+        RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        return inserted > 0
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+            self._synced_at = None
+            self._next_sync = 0
+
+
+revocations = RevocationList()
+
+
+def check_if_token_revoked(jwt_header, jwt_payload):
+    """``token_in_blocklist_loader`` for flask_jwt_extended."""
+    return revocations.is_revoked(jwt_payload['jti'])
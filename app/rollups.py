@@ -0,0 +1,113 @@
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect
+from app import db
+from app.models import Donation, DonationRollup
+from app.dialect import insert_or_add
+from app.payments import SUCCESS
+import click
+
+PERIODS = ('day', 'month')
+DIMENSIONS = ('frequency', 'recognition', 'status')
+# Donation attributes that decide which buckets a donation lands in and how much it adds.
+TRACKED = ('amount', 'frequency', 'recognition', 'status', 'created_at')
+
+
+def buckets(created_at):
+    day = created_at.date()
+    return {'day': day, 'month': day.replace(day=1)}
+
+
+def _accumulate(deltas, values, sign):
+    if values['created_at'] is None:
+        return
+    for period, bucket in buckets(values['created_at']).items():
+        key = (period, bucket, values['frequency'], values['recognition'], values['status'])
+        total, count = deltas.get(key, (0, 0))
+        deltas[key] = (total + sign * values['amount'], count + sign)
+
+
+def _apply(connection, deltas):
+    rows = [
+        {'period': period, 'bucket': bucket, 'frequency': frequency, 'recognition': recognition,
+         'status': status, 'total': total, 'count': count}
+        for (period, bucket, frequency, recognition, status), (total, count) in deltas.items()
+        if total or count
+    ]
+    if rows:
+        connection.execute(insert_or_add(
+            DonationRollup, rows, ['period', 'bucket', 'frequency', 'recognition', 'status'], ['total', 'count']
+        ))
+
+
+def _current(donation):
+    return {name: getattr(donation, name) for name in TRACKED}
+
+
+def _previous(donation):
+    state = inspect(donation)
+    values = {}
+    for name in TRACKED:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            values[name] = getattr(donation, name)
+    return values
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_donations(session, flush_context):
+    # Runs inside the same transaction as the donation write, so the rollups
+    # can never disagree with the rows they summarise.
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Donation):
+            _accumulate(deltas, _current(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Donation) and session.is_modified(obj, include_collections=False):
+            before, after = _previous(obj), _current(obj)
+            if before != after:
+                _accumulate(deltas, before, -1)
+                _accumulate(deltas, after, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Donation):
+            _accumulate(deltas, _previous(obj), -1)
+    _apply(session.connection(), deltas)
+
+
+def stats(period, dimension=None, start=None, end=None, status=SUCCESS):
+    """Sum the rollups per bucket (and per ``dimension`` when given), oldest first.
+
+    Only successful donations count unless another ``status`` is asked for;
+    ``status='all'`` sums every status.
+    """
+    columns = [DonationRollup.bucket]
+    if dimension:
+        columns.append(getattr(DonationRollup, dimension))
+    query = db.session.query(
+        *columns,
+        db.func.sum(DonationRollup.total).label('total'),
+        db.func.sum(DonationRollup.count).label('count')
+    ).filter(DonationRollup.period == period)
+    if status != 'all':
+        query = query.filter(DonationRollup.status == status)
+    if start:
+        query = query.filter(DonationRollup.bucket >= start)
+    if end:
+        query = query.filter(DonationRollup.bucket <= end)
+    return query.group_by(*columns).having(db.func.sum(DonationRollup.count) > 0).order_by(*columns).all()
+
+
+@click.command('rebuild-donation-rollups')
+@with_appcontext
+def rebuild_donation_rollups_command():
+    """Recompute every donation rollup from the donation table."""
+    deltas = {}
+    for row in db.session.query(*(getattr(Donation, name) for name in TRACKED)).yield_per(1000):
+        _accumulate(deltas, row._asdict(), 1)
+    db.session.query(DonationRollup).delete()
+    _apply(db.session.connection(), deltas)
+    db.session.commit()
+    click.echo(f"Rebuilt {len(deltas)} donation rollup buckets")
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
-from app import db, bcrypt
+from app import db
 from app.models import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from app.passwords import hash_password, check_password, needs_rehash, HashingBusy
+from app.identity import token_claims
+from app.revocation import revocations
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, current_user, get_jwt
 import logging
 import os
 
@@ -33,15 +36,18 @@ def register():
         if role == 'Admin' and data.get('admin_secret') != os.getenv('ADMIN_SECRET', 'your-admin-secret'):
             return jsonify({'error': 'Invalid admin secret'}), 403
 
-        password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        password_hash = hash_password(password)
         user = User(email=email, password_hash=password_hash, role=role)
         db.session.add(user)
         db.session.commit()
 
-        access_token = create_access_token(identity=str(user.id), additional_claims={'role': role})
+        access_token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
+        refresh_token = create_refresh_token(identity=str(user.id), additional_claims=token_claims(user))
         logging.debug(f"Register token for user {user.id} ({email}): {access_token}")
 
-        return jsonify({'access_token': access_token, 'role': role}), 201
+        return jsonify({'access_token': access_token, 'refresh_token': refresh_token, 'role': role}), 201
+    except HashingBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         logging.error(f"Error registering user: {str(e)}")
         db.session.rollback()
@@ -61,13 +67,21 @@ def login():
             return jsonify({'error': 'Email and password are required'}), 400
 
         user = User.query.filter_by(email=email).first()
-        if user and bcrypt.check_password_hash(user.password_hash, password):
-            access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+        if user and check_password(user.password_hash, password):
+            if needs_rehash(user.password_hash):
+                # BCRYPT_LOG_ROUNDS changed since this hash was made; upgrade it while we have the password.
+                user.password_hash = hash_password(password)
+                db.session.commit()
+            access_token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
+            refresh_token = create_refresh_token(identity=str(user.id), additional_claims=token_claims(user))
             logging.debug(f"Login token for user {user.id} ({email}): {access_token}")
 
-            return jsonify({'access_token': access_token, 'role': user.role}), 200
+            return jsonify({'access_token': access_token, 'refresh_token': refresh_token, 'role': user.role}), 200
         return jsonify({'error': 'Invalid credentials'}), 401
+    except HashingBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
+        db.session.rollback()
         logging.error(f"Error logging in: {str(e)}")
         return jsonify({'error': str(e)}), 500
     
@@ -75,13 +89,43 @@ def login():
 @jwt_required()
 def validate():
     try:
-        user_id = get_jwt_identity()
-        logging.debug(f"Validating JWT for user_id: {user_id}")
-        user = User.query.get(user_id)
-        if not user:
-            logging.error(f"No user found for id: {user_id}")
-            return jsonify({'error': 'User not found'}), 404
-        return jsonify({'email': user.email, 'role': user.role}), 200
+        # The token check already loaded (and cached) the user and rejects deleted or stale ones.
+        logging.debug(f"Validating JWT for user_id: {current_user.id}")
+        return jsonify({'email': current_user.email, 'role': current_user.role}), 200
     except Exception as e:
         logging.error(f"Error validating token: {str(e)}")
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    try:
+        # Rotation: the presented refresh token is spent, so a stolen copy stops working
+        # as soon as the real client refreshes. No password hashing involved.
+        claims = get_jwt()
+        if not revocations.revoke(claims['jti'], claims['exp']):
+            # Spent on another worker before its revocation reached this one.
+            db.session.rollback()
+            logging.error(f"Refresh token reused for user {current_user.id}")
+            return jsonify({'error': 'token already used'}), 401
+        db.session.commit()
+        access_token = create_access_token(identity=str(current_user.id), additional_claims=token_claims(current_user))
+        refresh_token = create_refresh_token(identity=str(current_user.id), additional_claims=token_claims(current_user))
+        return jsonify({'access_token': access_token, 'refresh_token': refresh_token, 'role': current_user.role}), 200
+    except Exception as e:
+        logging.error(f"Error refreshing token: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    try:
+        claims = get_jwt()
+        revocations.revoke(claims['jti'], claims['exp'])
+        db.session.commit()
+        return jsonify({'message': f"{claims['type'].capitalize()} token revoked"}), 200
+    except Exception as e:
+        logging.error(f"Error logging out: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,19 +1,50 @@
 from flask import Blueprint, request, jsonify, send_file, make_response
-from app import db
-from app.models import BlogPost, User, Comment, Like
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from PIL import Image, UnidentifiedImageError
+from app import db, cache, limiter
+from app.models import BlogPost, Comment, Like, ImageVariant
+from app.images import MAX_UPLOAD_BYTES, ImagePipelineBusy, process_upload, read_upload, choose_variant, variant_data
+from app.pagination import seek_page, load_in_order
+from app.conditional import make_etag, request_args_key, not_modified, with_validators
+from app.likes import like_buffer, toggle_now, PostNotFound
+from app.search import search, index_document, remove_document
+from app.fieldsets import FieldError, parse_fields, select_fields, serialize_fields
+from flask_jwt_extended import jwt_required, get_jwt, current_user
+from PIL import UnidentifiedImageError
 import io
 import logging
-import tempfile
-import os
 import binascii
 
 blog_bp = Blueprint('blog', __name__)
 
 logging.basicConfig(filename='/Users/apple/Desktop/senidea-enableall/senidea-backend/app.log', level=logging.DEBUG)
 
+def _public(response, max_age):
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
+    return response
+
+POST_FIELDS = {
+    'id': BlogPost.id,
+    'title': BlogPost.title,
+    'content': BlogPost.content,
+    'excerpt': BlogPost.excerpt,
+    'reading_time': BlogPost.reading_time,
+    'category': BlogPost.category,
+    'image_path': BlogPost.image_hash,
+    'image_mimetype': BlogPost.image_mimetype,
+    'author_id': BlogPost.author_id,
+    'created_at': BlogPost.created_at,
+    'updated_at': BlogPost.updated_at,
+    'comment_count': BlogPost.comment_count,
+    'like_count': BlogPost.like_count
+}
+# Listings send the teaser instead of the full text unless ?fields= asks for it.
+POST_LIST_FIELDS = [name for name in POST_FIELDS if name != 'content']
+POST_FORMATTERS = {
+    'image_path': lambda row, image_hash: f'/api/blog/image/{row.id}' if image_hash else None
+}
+
 @blog_bp.route('', methods=['GET', 'OPTIONS'])
+@cache.cached(tags=lambda: ['blog:list'])
 def get_posts():
     if request.method == 'OPTIONS':
         logging.debug("Handling OPTIONS for /api/blog")
@@ -29,57 +60,107 @@ def get_posts():
         category = request.args.get('category')
         limit = request.args.get('limit', type=int, default=3)
         offset = request.args.get('offset', type=int, default=0)
+        cursor = request.args.get('cursor')
+        try:
+            fields = parse_fields(request.args.get('fields'), POST_FIELDS, POST_LIST_FIELDS)
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
         query = BlogPost.query
         if category:
             query = query.filter_by(category=category)
-        total = query.count()
-        posts = query.order_by(BlogPost.created_at.desc()).limit(limit).offset(offset).all()
+        # Validator pass: read only the columns that decide whether the page changed.
+        keys = query.with_entities(BlogPost.id, BlogPost.created_at, BlogPost.updated_at, BlogPost.comment_count, BlogPost.like_count)
+        if cursor is not None:
+            # Keyset mode: seek on (created_at, id); the total is only counted on request.
+            limit = max(1, min(limit, 100))
+            total = query.with_entities(db.func.count(BlogPost.id)).scalar() if request.args.get('include_total', '').lower() in ('1', 'true') else None
+            try:
+                rows, next_cursor = seek_page(keys, BlogPost.created_at, BlogPost.id, cursor, limit)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        else:
+            total = query.with_entities(db.func.count(BlogPost.id)).scalar()
+            rows = keys.order_by(BlogPost.created_at.desc(), BlogPost.id.desc()).limit(limit).offset(offset).all()
+            next_cursor = None
+        etag = make_etag('posts', request_args_key(), total, [tuple(r) for r in rows])
+        cached = not_modified(etag)
+        if cached:
+            return _public(cached, 300)
+        posts = load_in_order(select_fields(BlogPost.query, POST_FIELDS, fields), BlogPost.id, [r.id for r in rows])
+        payload = {
+            'posts': [serialize_fields(p, fields, POST_FORMATTERS) for p in posts]
+        }
+        if total is not None:
+            payload['total'] = total
+        if cursor is not None:
+            payload['next_cursor'] = next_cursor
+        response = make_response(jsonify(payload))
+        return _public(with_validators(response, etag), 300), 200
+    except Exception as e:
+        logging.error(f"Error fetching blog posts: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@blog_bp.route('/search', methods=['GET'])
+@cache.cached(tags=lambda: ['blog:list'])
+def search_posts():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Search query is required'}), 400
+        limit = max(1, min(request.args.get('limit', type=int, default=10), 50))
+        offset = max(0, request.args.get('offset', type=int, default=0))
+        total, hits = search('blog_post', q, limit, offset)
+        posts = {p.id: p for p in load_in_order(BlogPost.query, BlogPost.id, [hit[0] for hit in hits])}
         response = make_response(jsonify({
-            'posts': [{
-                'id': p.id,
-                'title': p.title,
-                'content': p.content,
-                'category': p.category,
-                'image_path': f'/api/blog/image/{p.id}' if p.image_data else None,
-                'image_mimetype': p.image_mimetype,
-                'author_id': p.author_id,
-                'created_at': p.created_at.isoformat(),
-                'updated_at': p.updated_at.isoformat(),
-                'comment_count': len(p.comments),
-                'like_count': len(p.likes)
-            } for p in posts],
+            'results': [{
+                'id': id,
+                'title': posts[id].title,
+                'title_highlight': title,
+                'snippet': snippet,
+                'rank': rank,
+                'category': posts[id].category,
+                'image_path': f'/api/blog/image/{id}' if posts[id].has_image else None,
+                'created_at': posts[id].created_at.isoformat(),
+                'comment_count': posts[id].comment_count,
+                'like_count': posts[id].like_count
+            } for id, rank, title, snippet in hits if id in posts],
             'total': total
         }))
-        response.headers['Cache-Control'] = 'public, max-age=300'
-        # Handle empty posts list for ETag
-        response.headers['ETag'] = f'posts-{len(posts)}-{max(p.updated_at.timestamp() for p in posts) if posts else 0}'
-        response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
-        return response, 200
+        return _public(response, 300), 200
+    except NotImplementedError as e:
+        return jsonify({'error': str(e)}), 501
     except Exception as e:
-        logging.error(f"Error fetching blog posts: {str(e)}")
+        logging.error(f"Error searching blog posts: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @blog_bp.route('/<int:id>', methods=['GET'])
+@cache.cached(tags=lambda id: [f'blog:post:{id}'])
 def get_post(id):
     try:
+        keys = db.session.query(BlogPost.updated_at, BlogPost.comment_count, BlogPost.like_count).filter_by(id=id).first()
+        if keys is None:
+            return jsonify({'error': 'Blog post not found'}), 404
+        etag = make_etag('post', id, tuple(keys))
+        cached = not_modified(etag)
+        if cached:
+            return _public(cached, 300)
         post = BlogPost.query.get_or_404(id)
         response = make_response(jsonify({
             'id': post.id,
             'title': post.title,
             'content': post.content,
+            'excerpt': post.excerpt,
+            'reading_time': post.reading_time,
             'category': post.category,
-            'image_path': f'/api/blog/image/{post.id}' if post.image_data else None,
+            'image_path': f'/api/blog/image/{post.id}' if post.has_image else None,
             'image_mimetype': post.image_mimetype,
             'author_id': post.author_id,
             'created_at': post.created_at.isoformat(),
             'updated_at': post.updated_at.isoformat(),
-            'comment_count': len(post.comments),
-            'like_count': len(post.likes)
+            'comment_count': post.comment_count,
+            'like_count': post.like_count
         }))
-        response.headers['Cache-Control'] = 'public, max-age=300'
-        response.headers['ETag'] = f'post-{id}-{post.updated_at.timestamp()}'
-        response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
-        return response, 200
+        return _public(with_validators(response, etag), 300), 200
     except Exception as e:
         logging.error(f"Error fetching blog post {id}: {str(e)}")
         return jsonify({'error': 'Blog post not found'}), 404
@@ -98,16 +179,27 @@ def get_post_image(id):
     try:
         logging.debug(f"Fetching image for post {id}")
         post = BlogPost.query.get_or_404(id)
-        if not post.image_data:
+        if not post.has_image:
             logging.warning(f"No image data for post {id}")
             return jsonify({'error': 'No image found for this post'}), 404
+        variant = choose_variant(ImageVariant.query.filter_by(post_id=id), request.args.get('w', type=int), request.accept_mimetypes)
+        tag = f'{variant.width}-{variant.mimetype}' if variant else 'original'
+        etag = make_etag('image', id, post.image_hash, tag)
+        cached = not_modified(etag, post.updated_at)
+        if cached:
+            cached.headers['Vary'] = 'Accept'
+            return _public(cached, 86400)
+        if variant:
+            image_data, image_mimetype = variant_data(variant.id), variant.mimetype
+        else:
+            image_data, image_mimetype = post.image_data, post.image_mimetype
         response = make_response(send_file(
-            io.BytesIO(post.image_data),
-            mimetype=post.image_mimetype
+            io.BytesIO(image_data),
+            mimetype=image_mimetype
         ))
-        response.headers['Cache-Control'] = 'public, max-age=86400'
-        response.headers['ETag'] = f'image-{id}-{post.updated_at.timestamp()}'
-        response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
+        with_validators(response, etag, post.updated_at)
+        response.headers['Vary'] = 'Accept'
+        _public(response, 86400)
         logging.debug(f"Image for post {id} served successfully")
         return response
     except Exception as e:
@@ -121,48 +213,28 @@ def create_post():
         claims = get_jwt()
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
-        user = User.query.get_or_404(get_jwt_identity())
+        user = current_user
         if 'image' not in request.files:
             image_data = None
             image_mimetype = None
+            variants = []
         else:
             image = request.files['image']
             if image.filename == '':
                 return jsonify({'error': 'No image selected'}), 400
             if not image.mimetype.startswith('image/'):
                 return jsonify({'error': 'Invalid image format'}), 400
-            if image.content_length and image.content_length > 1 * 1024 * 1024:
+            if image.content_length and image.content_length > MAX_UPLOAD_BYTES:
                 return jsonify({'error': 'Image size exceeds 1MB'}), 400
             try:
-                # Log file details
-                image.seek(0)
-                first_bytes = image.read(8)
-                image.seek(0)
-                logging.debug(f"Processing image: filename={image.filename}, mimetype={image.mimetype}, size={image.content_length or 'unknown'}, first_bytes={binascii.hexlify(first_bytes)}")
-                
-                # Save to temporary file to ensure stream integrity
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(image.filename)[1]) as temp_file:
-                    image.save(temp_file.name)
-                    logging.debug(f"Saved image to temp file: {temp_file.name}")
-                    img = Image.open(temp_file.name)
-                    img.verify()  # Verify image
-                    img = Image.open(temp_file.name)  # Reopen for processing
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    output = io.BytesIO()
-                    format_map = {
-                        'image/jpeg': 'JPEG',
-                        'image/png': 'PNG',
-                        'image/gif': 'GIF',
-                        'image/bmp': 'BMP',
-                        'image/webp': 'WEBP'
-                    }
-                    image_format = format_map.get(image.mimetype, 'JPEG')  # Fallback to JPEG
-                    img.save(output, format=image_format, quality=85 if image_format == 'JPEG' else None)
-                    image_data = output.getvalue()
-                    image_mimetype = image.mimetype
-                os.unlink(temp_file.name)  # Clean up temp file
+                data = read_upload(image)
+                if data is None:
+                    return jsonify({'error': 'Image size exceeds 1MB'}), 400
+                logging.debug(f"Processing image: filename={image.filename}, mimetype={image.mimetype}, size={len(data)}, first_bytes={binascii.hexlify(data[:8])}")
+                image_data, image_mimetype, variants = process_upload(data, image.mimetype)
                 logging.debug(f"Processed image {image.filename} successfully")
+            except ImagePipelineBusy as e:
+                return jsonify({'error': str(e)}), 503
             except UnidentifiedImageError as e:
                 logging.error(f"Cannot identify image file {image.filename}: {str(e)}")
                 return jsonify({'error': f'Invalid image file: {str(e)}'}), 400
@@ -183,10 +255,14 @@ def create_post():
             category=category,
             image_data=image_data,
             image_mimetype=image_mimetype,
+            variants=variants,
             author_id=user.id
         )
         db.session.add(post)
+        db.session.flush()
+        index_document('blog_post', post.id, post.title, post.content)
         db.session.commit()
+        cache.invalidate('blog:list')
         logging.info(f"Blog post created with ID {post.id} by user {user.id}")
         return jsonify({'message': 'Blog post created successfully', 'id': post.id}), 201
     except Exception as e:
@@ -201,7 +277,7 @@ def update_post(id):
         claims = get_jwt()
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
-        user = User.query.get_or_404(get_jwt_identity())
+        user = current_user
         post = BlogPost.query.get_or_404(id)
 
         if 'image' in request.files:
@@ -209,33 +285,16 @@ def update_post(id):
             if image.filename != '':
                 if not image.mimetype.startswith('image/'):
                     return jsonify({'error': 'Invalid image format'}), 400
-                if image.content_length and image.content_length > 1 * 1024 * 1024:
+                if image.content_length and image.content_length > MAX_UPLOAD_BYTES:
                     return jsonify({'error': 'Image size exceeds 1MB'}), 400
                 try:
-                    image.seek(0)
-                    first_bytes = image.read(8)
-                    image.seek(0)
-                    logging.debug(f"Processing image: filename={image.filename}, mimetype={image.mimetype}, size={image.content_length or 'unknown'}, first_bytes={binascii.hexlify(first_bytes)}")
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(image.filename)[1]) as temp_file:
-                        image.save(temp_file.name)
-                        img = Image.open(temp_file.name)
-                        img.verify()
-                        img = Image.open(temp_file.name)
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        output = io.BytesIO()
-                        format_map = {
-                            'image/jpeg': 'JPEG',
-                            'image/png': 'PNG',
-                            'image/gif': 'GIF',
-                            'image/bmp': 'BMP',
-                            'image/webp': 'WEBP'
-                        }
-                        image_format = format_map.get(image.mimetype, 'JPEG')
-                        img.save(output, format=image_format, quality=85 if image_format == 'JPEG' else None)
-                        post.image_data = output.getvalue()
-                        post.image_mimetype = image.mimetype
-                    os.unlink(temp_file.name)
+                    data = read_upload(image)
+                    if data is None:
+                        return jsonify({'error': 'Image size exceeds 1MB'}), 400
+                    logging.debug(f"Processing image: filename={image.filename}, mimetype={image.mimetype}, size={len(data)}, first_bytes={binascii.hexlify(data[:8])}")
+                    post.image_data, post.image_mimetype, post.variants = process_upload(data, image.mimetype)
+                except ImagePipelineBusy as e:
+                    return jsonify({'error': str(e)}), 503
                 except UnidentifiedImageError as e:
                     logging.error(f"Cannot identify image file {image.filename}: {str(e)}")
                     return jsonify({'error': f'Invalid image file: {str(e)}'}), 400
@@ -245,6 +304,7 @@ def update_post(id):
             else:
                 post.image_data = None
                 post.image_mimetype = None
+                post.variants = []
 
         title = request.form.get('title', post.title)
         content = request.form.get('content', post.content)
@@ -253,7 +313,9 @@ def update_post(id):
         post.title = title
         post.content = content
         post.category = category
+        index_document('blog_post', post.id, title, content)
         db.session.commit()
+        cache.invalidate('blog:list', f'blog:post:{id}')
         logging.info(f"Blog post {id} updated by user {user.id}")
         return jsonify({'message': 'Blog post updated successfully'}), 200
     except Exception as e:
@@ -268,10 +330,13 @@ def delete_post(id):
         claims = get_jwt()
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
-        user = User.query.get_or_404(get_jwt_identity())
+        user = current_user
         post = BlogPost.query.get_or_404(id)
         db.session.delete(post)
+        remove_document('blog_post', id)
         db.session.commit()
+        cache.invalidate('blog:list', f'blog:post:{id}', f'blog:comments:{id}')
+        like_buffer.discard_post(id)
         logging.info(f"Blog post {id} deleted by user {user.id}")
         return jsonify({'message': 'Blog post deleted successfully'}), 200
     except Exception as e:
@@ -280,6 +345,7 @@ def delete_post(id):
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @blog_bp.route('/<int:id>/comments', methods=['GET', 'OPTIONS'])
+@cache.cached(tags=lambda id: [f'blog:comments:{id}'])
 def get_comments(id):
     if request.method == 'OPTIONS':
         logging.debug(f"Handling OPTIONS for /api/blog/{id}/comments")
@@ -291,22 +357,47 @@ def get_comments(id):
         return response
 
     try:
-        post = BlogPost.query.get_or_404(id)
-        comments = Comment.query.filter_by(post_id=id).order_by(Comment.created_at.desc()).all()
-        response = make_response(jsonify([{
+        # The maintained counter doubles as the existence check, so the post row is never loaded.
+        comment_count = db.session.query(BlogPost.comment_count).filter_by(id=id).scalar()
+        if comment_count is None:
+            return jsonify({'error': 'Blog post not found'}), 404
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            limit = max(1, min(request.args.get('limit', type=int, default=20), 100))
+            keys = Comment.query.with_entities(Comment.id, Comment.created_at).filter_by(post_id=id)
+            try:
+                rows, next_cursor = seek_page(keys, Comment.created_at, Comment.id, cursor, limit)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            # Comments are never edited, so the ids on the page pin down its content.
+            etag = make_etag('comments', id, request_args_key(), comment_count, [r.id for r in rows])
+        else:
+            newest = db.session.query(db.func.max(Comment.id)).filter_by(post_id=id).scalar()
+            etag = make_etag('comments', id, comment_count, newest)
+        cached = not_modified(etag)
+        if cached:
+            return _public(cached, 300)
+        if cursor is not None:
+            comments = load_in_order(Comment.query, Comment.id, [r.id for r in rows])
+        else:
+            comments = Comment.query.filter_by(post_id=id).order_by(Comment.created_at.desc(), Comment.id.desc()).all()
+        serialized = [{
             'id': c.id,
             'content': c.content,
             'username': c.username,
             'created_at': c.created_at.isoformat()
-        } for c in comments]))
-        response.headers['Cache-Control'] = 'public, max-age=300'
-        response.headers['Access-Control-Allow-Origin'] = request.headers.get('Origin', '*')
-        return response, 200
+        } for c in comments]
+        if cursor is not None:
+            response = make_response(jsonify({'comments': serialized, 'next_cursor': next_cursor, 'total': comment_count}))
+        else:
+            response = make_response(jsonify(serialized))
+        return _public(with_validators(response, etag), 300), 200
     except Exception as e:
         logging.error(f"Error fetching comments for post {id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @blog_bp.route('/<int:id>/comments', methods=['POST'])
+@limiter.limit('5/minute', burst=5)
 def add_comment(id):
     try:
         post = BlogPost.query.get_or_404(id)
@@ -325,7 +416,9 @@ def add_comment(id):
             content=data['content']
         )
         db.session.add(comment)
+        BlogPost.bump_counter(id, 'comment_count', 1)
         db.session.commit()
+        cache.invalidate('blog:list', f'blog:post:{id}', f'blog:comments:{id}')
         logging.info(f"Comment added to post {id} by {data['username']}")
         return jsonify({'message': 'Comment added successfully', 'id': comment.id}), 201
     except Exception as e:
@@ -334,27 +427,26 @@ def add_comment(id):
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @blog_bp.route('/<int:id>/like', methods=['POST'])
+@limiter.limit('60/minute', burst=20)
 def toggle_like(id):
     try:
-        post = BlogPost.query.get_or_404(id)
         ip_address = request.remote_addr or request.headers.get('X-Forwarded-For', 'unknown')
         logging.debug(f"Toggle like for post {id}, IP: {ip_address}")
         if ip_address == 'unknown':
             return jsonify({'error': 'Unable to detect IP address'}), 400
-        like = Like.query.filter_by(post_id=id, ip_address=ip_address).first()
-        if like:
-            db.session.delete(like)
-            db.session.commit()
-            like_count = len(post.likes)
-            logging.info(f"Like removed from post {id} by IP {ip_address}, new like_count: {like_count}")
-            return jsonify({'message': 'Like removed successfully', 'like_count': like_count}), 200
-        else:
-            like = Like(post_id=id, user_id=None, ip_address=ip_address)
-            db.session.add(like)
-            db.session.commit()
-            like_count = len(post.likes)
+        try:
+            if like_buffer.enabled:
+                liked, like_count = like_buffer.toggle(id, ip_address)
+            else:
+                liked, like_count = toggle_now(id, ip_address)
+                cache.invalidate('blog:list', f'blog:post:{id}')
+        except PostNotFound:
+            return jsonify({'error': 'Blog post not found'}), 404
+        if liked:
             logging.info(f"Like added to post {id} by IP {ip_address}, new like_count: {like_count}")
             return jsonify({'message': 'Like added successfully', 'like_count': like_count}), 201
+        logging.info(f"Like removed from post {id} by IP {ip_address}, new like_count: {like_count}")
+        return jsonify({'message': 'Like removed successfully', 'like_count': like_count}), 200
     except Exception as e:
         logging.error(f"Error toggling like for post {id}: {str(e)}")
         db.session.rollback()
@@ -366,8 +458,10 @@ def get_likes(id):
         post = BlogPost.query.get_or_404(id)
         ip_address = request.remote_addr or request.headers.get('X-Forwarded-For', 'unknown')
         logging.debug(f"Fetching likes for post {id}, IP: {ip_address}")
-        like_count = len(post.likes)
-        user_liked = Like.query.filter_by(post_id=id, ip_address=ip_address).first() is not None
+        like_count = post.like_count + like_buffer.pending_delta(id)
+        user_liked = like_buffer.pending_state(id, ip_address)
+        if user_liked is None:
+            user_liked = Like.query.filter_by(post_id=id, ip_address=ip_address).first() is not None
         response = make_response(jsonify({
             'like_count': like_count,
             'user_liked': user_liked
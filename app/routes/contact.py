@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
-from app import db
+from app import db, limiter
 from app.models import ContactMessage
+from app.listing import list_response
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt
 import logging
@@ -10,6 +11,7 @@ contact_bp = Blueprint('contact', __name__)
 logging.basicConfig(level=logging.DEBUG)
 
 @contact_bp.route('', methods=['POST'])
+@limiter.limit('10/hour', burst=3)
 def create_contacts():
     try:
         data = request.get_json()
@@ -50,18 +52,16 @@ def get_contacts():
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        contacts = ContactMessage.query.order_by(ContactMessage.created_at.desc()).all()
-        return jsonify({
-            'contacts': [{
-                'id': c.id,
-                'name': c.name,
-                'email': c.email,
-                'message': c.message,
-                'phone_number': c.phone_number,
-                'address': c.address,
-                'created_at': c.created_at.isoformat()
-            } for c in contacts]
-        }), 200
+        query = ContactMessage.query.order_by(ContactMessage.created_at.desc(), ContactMessage.id.desc())
+        return list_response(query, lambda c: {
+            'id': c.id,
+            'name': c.name,
+            'email': c.email,
+            'message': c.message,
+            'phone_number': c.phone_number,
+            'address': c.address,
+            'created_at': c.created_at.isoformat()
+        }, 'contacts')
     except Exception as e:
         logging.error(f"Error fetching contacts: {str(e)}")
         return jsonify({'error': str(e)}), 500
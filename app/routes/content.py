@@ -1,7 +1,13 @@
-from flask import Blueprint, request, jsonify, send_file
-from app import db
-from app.models import Content, User
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from flask import Blueprint, request, jsonify, send_file, make_response
+from app import db, cache
+from app.models import Content, ImageVariant
+from app.images import MAX_UPLOAD_BYTES, ImagePipelineBusy, make_variants, read_upload, choose_variant, variant_data
+from app.pagination import load_in_order
+from app.conditional import make_etag, request_args_key, not_modified, with_validators, revalidate
+from app.search import search, index_document, remove_document
+from app.fieldsets import FieldError, parse_fields, select_fields, serialize_fields
+from flask_jwt_extended import jwt_required, get_jwt, current_user
+from PIL import UnidentifiedImageError
 from io import BytesIO
 import logging
 
@@ -9,43 +15,107 @@ content_bp = Blueprint('content_main', __name__)
 
 logging.basicConfig(level=logging.DEBUG)
 
+CONTENT_FIELDS = {
+    'id': Content.id,
+    'title': Content.title,
+    'body': Content.body,
+    'excerpt': Content.excerpt,
+    'reading_time': Content.reading_time,
+    'category': Content.category,
+    'image_path': Content.image_hash,
+    'image_mimetype': Content.image_mimetype,
+    'created_at': Content.created_at,
+    'updated_at': Content.updated_at
+}
+CONTENT_LIST_FIELDS = [name for name in CONTENT_FIELDS if name != 'body']
+CONTENT_FORMATTERS = {
+    'image_path': lambda row, image_hash: f'/api/content/image/{row.id}' if image_hash else None
+}
+
+def _serialize(c):
+    return {
+        'id': c.id,
+        'title': c.title,
+        'body': c.body,
+        'excerpt': c.excerpt,
+        'reading_time': c.reading_time,
+        'category': c.category,
+        'image_path': f'/api/content/image/{c.id}' if c.has_image else None,
+        'image_mimetype': c.image_mimetype,
+        'created_at': c.created_at.isoformat(),
+        'updated_at': c.updated_at.isoformat()
+    }
+
 @content_bp.route('', methods=['GET'])
+@cache.cached(tags=lambda: ['content:list'])
 def get_all_content():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        contents = Content.query.order_by(Content.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            fields = parse_fields(request.args.get('fields'), CONTENT_FIELDS, CONTENT_LIST_FIELDS)
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        keys = Content.query.with_entities(Content.id, Content.updated_at).order_by(Content.created_at.desc(), Content.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        etag = make_etag('contents', request_args_key(), keys.total, [tuple(r) for r in keys.items])
+        cached = not_modified(etag)
+        if cached:
+            return revalidate(cached)
+        contents = load_in_order(select_fields(Content.query, CONTENT_FIELDS, fields), Content.id, [r.id for r in keys.items])
+        response = make_response(jsonify({
+            'contents': [serialize_fields(c, fields, CONTENT_FORMATTERS) for c in contents],
+            'total': keys.total,
+            'pages': keys.pages,
+            'current_page': keys.page
+        }))
+        return revalidate(with_validators(response, etag)), 200
+    except Exception as e:
+        logging.error(f"Error fetching content: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@content_bp.route('/search', methods=['GET'])
+@cache.cached(tags=lambda: ['content:list'])
+def search_content():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Search query is required'}), 400
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = max(1, min(request.args.get('per_page', 10, type=int), 50))
+        total, hits = search('content', q, per_page, (page - 1) * per_page)
+        contents = {c.id: c for c in load_in_order(Content.query, Content.id, [hit[0] for hit in hits])}
+        results = []
+        for id, rank, title, snippet in hits:
+            if id in contents:
+                result = _serialize(contents[id])
+                result.update({'title_highlight': title, 'snippet': snippet, 'rank': rank})
+                results.append(result)
         return jsonify({
-            'contents': [{
-                'id': c.id,
-                'title': c.title,
-                'body': c.body,
-                'category': c.category,
-                'image_mimetype': c.image_mimetype,
-                'created_at': c.created_at.isoformat(),
-                'updated_at': c.updated_at.isoformat()
-            } for c in contents.items],
-            'total': contents.total,
-            'pages': contents.pages,
-            'current_page': contents.page
+            'results': results,
+            'total': total,
+            'pages': -(-total // per_page),
+            'current_page': page
         }), 200
+    except NotImplementedError as e:
+        return jsonify({'error': str(e)}), 501
     except Exception as e:
-        logging.error(f"Error fetching content: {str(e)}")
+        logging.error(f"Error searching content: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @content_bp.route('/<int:id>', methods=['GET'])
+@cache.cached(tags=lambda id: [f'content:item:{id}'])
 def get_content_by_id(id):
     try:
+        updated_at = db.session.query(Content.updated_at).filter_by(id=id).scalar()
+        if updated_at is None:
+            return jsonify({'error': 'Content not found'}), 404
+        etag = make_etag('content', id, updated_at)
+        cached = not_modified(etag, updated_at)
+        if cached:
+            return revalidate(cached)
         content = Content.query.get_or_404(id)
-        return jsonify({
-            'id': content.id,
-            'title': content.title,
-            'body': content.body,
-            'category': content.category,
-            'image_mimetype': content.image_mimetype,
-            'created_at': content.created_at.isoformat(),
-            'updated_at': content.updated_at.isoformat()
-        }), 200
+        response = make_response(jsonify(_serialize(content)))
+        return revalidate(with_validators(response, etag, updated_at)), 200
     except Exception as e:
         logging.error(f"Error fetching content {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -54,30 +124,42 @@ def get_content_by_id(id):
 def get_content_image(id):
     try:
         content = Content.query.get_or_404(id)
-        if not content.image_data:
+        if not content.has_image:
             return jsonify({'error': 'No image available'}), 404
-        return send_file(
-            BytesIO(content.image_data),
-            mimetype=content.image_mimetype,
+        variant = choose_variant(ImageVariant.query.filter_by(content_id=id), request.args.get('w', type=int), request.accept_mimetypes)
+        etag = make_etag('content-image', id, content.image_hash, f'{variant.width}-{variant.mimetype}' if variant else 'original')
+        cached = not_modified(etag, content.updated_at)
+        if cached:
+            cached.headers['Vary'] = 'Accept'
+            return cached
+        response = send_file(
+            BytesIO(variant_data(variant.id) if variant else content.image_data),
+            mimetype=variant.mimetype if variant else content.image_mimetype,
             as_attachment=False
         )
+        with_validators(response, etag, content.updated_at)
+        response.headers['Vary'] = 'Accept'
+        return response
     except Exception as e:
         logging.error(f"Error fetching content image {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @content_bp.route('/<category>', methods=['GET'])
+@cache.cached(tags=lambda category: ['content:list'])
 def get_content_by_category(category):
     try:
-        contents = Content.query.filter_by(category=category).all()
-        return jsonify([{
-            'id': c.id,
-            'title': c.title,
-            'body': c.body,
-            'category': c.category,
-            'image_mimetype': c.image_mimetype,
-            'created_at': c.created_at.isoformat(),
-            'updated_at': c.updated_at.isoformat()
-        } for c in contents]), 200
+        try:
+            fields = parse_fields(request.args.get('fields'), CONTENT_FIELDS, CONTENT_LIST_FIELDS)
+        except FieldError as e:
+            return jsonify({'error': str(e)}), 400
+        keys = Content.query.with_entities(Content.id, Content.updated_at).filter_by(category=category).order_by(Content.id).all()
+        etag = make_etag('content-category', category, request_args_key(), [tuple(r) for r in keys])
+        cached = not_modified(etag)
+        if cached:
+            return revalidate(cached)
+        contents = load_in_order(select_fields(Content.query, CONTENT_FIELDS, fields), Content.id, [r.id for r in keys])
+        response = make_response(jsonify([serialize_fields(c, fields, CONTENT_FORMATTERS) for c in contents]))
+        return revalidate(with_validators(response, etag)), 200
     except Exception as e:
         logging.error(f"Error fetching content by category {category}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -90,20 +172,33 @@ def create_content():
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        user = User.query.get_or_404(get_jwt_identity())
+        user = current_user
         if 'image' not in request.files:
             image_data = None
             image_mimetype = None
+            variants = []
         else:
             image = request.files['image']
             if image.filename == '':
                 return jsonify({'error': 'No image selected'}), 400
             if not image.mimetype.startswith('image/'):
                 return jsonify({'error': 'Invalid image format'}), 400
-            if image.content_length > 1 * 1024 * 1024:  # 1MB limit
+            if image.content_length and image.content_length > MAX_UPLOAD_BYTES:
+                return jsonify({'error': 'Image size exceeds 1MB'}), 400
+            image_data = read_upload(image)
+            if image_data is None:
                 return jsonify({'error': 'Image size exceeds 1MB'}), 400
-            image_data = image.read()
             image_mimetype = image.mimetype
+            try:
+                variants = make_variants(image_data)
+            except ImagePipelineBusy as e:
+                return jsonify({'error': str(e)}), 503
+            except UnidentifiedImageError as e:
+                logging.error(f"Cannot identify image file {image.filename}: {str(e)}")
+                return jsonify({'error': f'Invalid image file: {str(e)}'}), 400
+            except Exception as e:
+                logging.error(f"Error processing image {image.filename}: {str(e)}")
+                return jsonify({'error': f'Image processing error: {str(e)}'}), 400
 
         title = request.form.get('title')
         body = request.form.get('body')
@@ -118,10 +213,14 @@ def create_content():
             category=category,
             image_data=image_data,
             image_mimetype=image_mimetype,
+            variants=variants,
             user_id=user.id
         )
         db.session.add(content)
+        db.session.flush()
+        index_document('content', content.id, content.title, content.body)
         db.session.commit()
+        cache.invalidate('content:list')
         return jsonify({'message': 'Content created successfully'}), 201
     except Exception as e:
         logging.error(f"Error creating content: {str(e)}")
@@ -136,7 +235,6 @@ def update_content(id):
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        user = User.query.get_or_404(get_jwt_identity())
         content = Content.query.get_or_404(id)
 
         if 'image' in request.files:
@@ -144,13 +242,27 @@ def update_content(id):
             if image.filename != '':
                 if not image.mimetype.startswith('image/'):
                     return jsonify({'error': 'Invalid image format'}), 400
-                if image.content_length > 1 * 1024 * 1024:
+                if image.content_length and image.content_length > MAX_UPLOAD_BYTES:
+                    return jsonify({'error': 'Image size exceeds 1MB'}), 400
+                image_data = read_upload(image)
+                if image_data is None:
                     return jsonify({'error': 'Image size exceeds 1MB'}), 400
-                content.image_data = image.read()
+                try:
+                    content.variants = make_variants(image_data)
+                except ImagePipelineBusy as e:
+                    return jsonify({'error': str(e)}), 503
+                except UnidentifiedImageError as e:
+                    logging.error(f"Cannot identify image file {image.filename}: {str(e)}")
+                    return jsonify({'error': f'Invalid image file: {str(e)}'}), 400
+                except Exception as e:
+                    logging.error(f"Error processing image {image.filename}: {str(e)}")
+                    return jsonify({'error': f'Image processing error: {str(e)}'}), 400
+                content.image_data = image_data
                 content.image_mimetype = image.mimetype
             else:
                 content.image_data = None
                 content.image_mimetype = None
+                content.variants = []
 
         title = request.form.get('title', content.title)
         body = request.form.get('body', content.body)
@@ -159,7 +271,9 @@ def update_content(id):
         content.title = title
         content.body = body
         content.category = category
+        index_document('content', content.id, title, body)
         db.session.commit()
+        cache.invalidate('content:list', f'content:item:{id}')
         return jsonify({'message': 'Content updated successfully'}), 200
     except Exception as e:
         logging.error(f"Error updating content {id}: {str(e)}")
@@ -174,10 +288,11 @@ def delete_content(id):
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        user = User.query.get_or_404(get_jwt_identity())
         content = Content.query.get_or_404(id)
         db.session.delete(content)
+        remove_document('content', id)
         db.session.commit()
+        cache.invalidate('content:list', f'content:item:{id}')
         return jsonify({'message': 'Content deleted successfully'}), 200
     except Exception as e:
         logging.error(f"Error deleting content {id}: {str(e)}")
@@ -1,13 +1,16 @@
-from flask import Blueprint, request, jsonify
-from app import db
+from flask import Blueprint, request, jsonify, current_app
+from app import db, paystack
 from app.models import Donation, User
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from paystackapi.transaction import Transaction
+from app.listing import list_response, parse_date
+from app.rollups import PERIODS, DIMENSIONS, stats
+from flask_jwt_extended import jwt_required, get_jwt, current_user
+from app.paystack import PaystackError
+from app.payments import PENDING, SUCCESS, to_kobo, record_transaction, refresh_status, reconcile_pending
+from datetime import timedelta
 import os
 import logging
 
 donation_bp = Blueprint('donation_main', __name__)
-PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY')
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -29,34 +32,24 @@ def donate():
             return jsonify({'error': 'Amount and email are required'}), 400
 
         user_id = None
-        try:
-            
-            user_id = get_jwt_identity()
-            if user_id:
-                logging.debug(f"JWT identity: {user_id}")
-                user = User.query.get(user_id)
-                if user:
-                    email = user.email
-                    logging.debug(f"User found: id={user_id}, email={email}")
-                else:
-                    logging.error(f"No user found for id: {user_id}")
-                    user_id = None
-            else:
-                logging.debug("No valid JWT token provided")
-        except Exception as e:
-            logging.error(f"JWT processing error: {str(e)}")
-            user_id = None
+        if current_user:
+            # Loaded once per process by the token check; the token's own email wins over the form.
+            user_id = current_user.id
+            email = get_jwt().get('email') or current_user.email
+            logging.debug(f"User found: id={user_id}, email={email}")
+        else:
+            logging.debug("No valid JWT token provided")
 
         logging.debug(f"Creating donation with user_id: {user_id}, email: {email}")
-        transaction = Transaction(secret_key=PAYSTACK_SECRET_KEY)
-        response = transaction.initialize(
+        response = paystack.initialize_transaction(
             email=email,
-            amount=int(amount * 100),
+            amount=to_kobo(amount),
             callback_url = os.environ.get(
                 'FRONTEND_URL', 
                 'https://senideafoundation.org'
             ) + '/api/donation/verify',
-            metadata={'user_id': user_id, 'frequency': frequency, 'recognition': recognition}
+            metadata={'user_id': user_id, 'frequency': frequency, 'recognition': recognition},
+            currency=current_app.config.get('PAYSTACK_CURRENCY')
         )
 
         if response['status']:
@@ -78,6 +71,8 @@ def donate():
             }), 200
         else:
             return jsonify({'error': response['message']}), 400
+    except PaystackError as e:
+        return jsonify({'error': 'Payment provider unavailable', 'details': str(e)}), 502
     except Exception as e:
         logging.error(f"Error initializing donation: {str(e)}")
         db.session.rollback()
@@ -90,20 +85,45 @@ def verify_donation():
         if not reference:
             return jsonify({'error': 'No reference provided'}), 400
 
-        transaction = Transaction(secret_key=PAYSTACK_SECRET_KEY)
-        response = transaction.verify(reference=reference)
-        logging.debug(f"Paystack verify response for {reference}: {response}")
-        if response['status'] and response['data']['status'] == 'success':
-            donation = Donation.query.filter_by(paystack_transaction_ref=reference).first()
-            if donation:
-                db.session.commit()
-                return jsonify({'message': 'Donation verified successfully', 'reference': reference}), 200
+        # The webhook records the outcome; Paystack is only asked while it hasn't arrived yet.
+        status = db.session.query(Donation.status).filter_by(paystack_transaction_ref=reference).scalar()
+        if status is None:
             return jsonify({'error': 'Donation not found in database', 'reference': reference}), 404
-        return jsonify({'error': 'Transaction verification failed', 'details': response.get('message', 'No message provided')}), 400
+        if status == PENDING:
+            status = refresh_status(reference)
+        if status == SUCCESS:
+            return jsonify({'message': 'Donation verified successfully', 'reference': reference, 'status': status}), 200
+        if status == PENDING:
+            return jsonify({'message': 'Payment confirmation pending', 'reference': reference, 'status': status}), 202
+        return jsonify({'error': 'Transaction verification failed', 'reference': reference, 'status': status}), 400
     except Exception as e:
         logging.error(f"Error verifying donation {reference}: {str(e)}")
         return jsonify({'error': 'Verification error', 'details': str(e)}), 500
 
+def _process_webhook(app, event, data):
+    with app.app_context():
+        try:
+            donation = record_transaction(data)
+            db.session.commit()
+            logging.info(f"Paystack {event} for {data.get('reference')} -> {donation.status if donation else 'no donation'}")
+        except Exception as e:
+            logging.error(f"Error processing Paystack {event} for {data.get('reference')}: {str(e)}")
+            db.session.rollback()
+
+@donation_bp.route('/webhook', methods=['POST'])
+def paystack_webhook():
+    body = request.get_data()
+    if not paystack.verify_signature(body, request.headers.get('x-paystack-signature')):
+        logging.warning("Rejected Paystack webhook with a bad signature")
+        return jsonify({'error': 'Invalid signature'}), 401
+    payload = request.get_json(silent=True) or {}
+    event, data = payload.get('event'), payload.get('data') or {}
+    response = jsonify({'status': 'ok'})
+    if event and event.startswith('charge.') and data.get('reference'):
+        # Acknowledge first; the donation is updated once the response has gone out.
+        response.call_on_close(lambda app=current_app._get_current_object(): _process_webhook(app, event, data))
+    return response, 200
+
 @donation_bp.route('', methods=['GET'])
 @jwt_required()
 def get_donations():
@@ -112,21 +132,115 @@ def get_donations():
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        donations = Donation.query.all()
-        return jsonify([{
+        try:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'), end_of_day=True)
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO 8601, e.g. 2024-07-01'}), 400
+
+        # The donor's account email comes from the same query instead of one lookup per row.
+        query = Donation.query.outerjoin(User, User.id == Donation.user_id).with_entities(
+            Donation.id,
+            Donation.user_id,
+            db.func.coalesce(User.email, Donation.email).label('user_email'),
+            Donation.amount,
+            Donation.frequency,
+            Donation.recognition,
+            Donation.paystack_transaction_ref,
+            Donation.status,
+            Donation.verified_at,
+            Donation.created_at
+        )
+        if start:
+            query = query.filter(Donation.created_at >= start)
+        if end:
+            query = query.filter(Donation.created_at < end)
+        if request.args.get('frequency'):
+            query = query.filter(Donation.frequency == request.args['frequency'])
+        if request.args.get('status'):
+            query = query.filter(Donation.status == request.args['status'])
+        if request.args.get('email'):
+            query = query.filter(db.func.lower(Donation.email) == request.args['email'].strip().lower())
+        query = query.order_by(Donation.created_at.desc(), Donation.id.desc())
+        return list_response(query, lambda d: {
             'id': d.id,
             'user_id': d.user_id,
-            'user_email': User.query.get(d.user_id).email if d.user_id else d.email,
+            'user_email': d.user_email,
             'amount': d.amount,
             'frequency': d.frequency,
             'recognition': d.recognition,
             'paystack_transaction_ref': d.paystack_transaction_ref,
+            'status': d.status,
+            'verified_at': d.verified_at.isoformat() if d.verified_at else None,
             'created_at': d.created_at.isoformat()
-        } for d in donations]), 200
+        }, 'donations', bare=True, seek=(Donation.created_at, Donation.id))
     except Exception as e:
         logging.error(f"Error fetching donations: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@donation_bp.route('/reconcile', methods=['POST'])
+@jwt_required()
+def reconcile_donations():
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        data = request.get_json(silent=True) or {}
+        # Bounded so one request finishes well inside a serverless time limit;
+        # `flask reconcile-donations` has no cap for large backlogs.
+        limit = max(1, min(int(data.get('limit', 200)), 500))
+        older_than = timedelta(minutes=max(0, int(data.get('older_than', 30))))
+        summary = reconcile_pending(older_than, limit)
+        return jsonify(summary), 200
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit and older_than must be integers'}), 400
+    except Exception as e:
+        logging.error(f"Error reconciling donations: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+@donation_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_donation_stats():
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        period = request.args.get('period', 'month')
+        if period not in PERIODS:
+            return jsonify({'error': f"period must be one of {', '.join(PERIODS)}"}), 400
+        group_by = request.args.get('group_by')
+        if group_by and group_by not in DIMENSIONS:
+            return jsonify({'error': f"group_by must be one of {', '.join(DIMENSIONS)}"}), 400
+        try:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'))
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO 8601, e.g. 2024-07-01'}), 400
+
+        # Unpaid donations are not income: report successful ones unless status=all (or another status) is asked for.
+        status = request.args.get('status') or SUCCESS
+        rows = stats(period, group_by, start and start.date(), end and end.date(), status)
+        buckets = []
+        for row in rows:
+            bucket = {'bucket': row.bucket.isoformat(), 'total': round(row.total, 2), 'count': row.count}
+            if group_by:
+                bucket[group_by] = getattr(row, group_by)
+            buckets.append(bucket)
+        return jsonify({
+            'period': period,
+            'group_by': group_by,
+            'status': status,
+            'buckets': buckets,
+            'total': round(sum(row.total for row in rows), 2),
+            'count': sum(row.count for row in rows)
+        }), 200
+    except Exception as e:
+        logging.error(f"Error fetching donation stats: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @donation_bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_donation(id):
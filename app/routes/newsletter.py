@@ -1,34 +1,54 @@
 from flask import Blueprint, request, jsonify
-from app import db
-from app.models import NewsletterSubscription
+from app import db, limiter
+from app.models import NewsletterSubscription, NewsletterCampaign
+from app.mailer import CampaignBusy, send_campaign, progress
+from app.listing import list_response, parse_date, stream_csv
+from app.dialect import insert_ignore
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt
+import csv
+import io
 import logging
+import re
 
 newsletter_bp = Blueprint('newsletter', __name__)
 
 logging.basicConfig(level=logging.DEBUG)
 
+IMPORT_BATCH_SIZE = 1000
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+def _normalize_email(email):
+    email = (email or '').strip().lower()
+    return email if EMAIL_PATTERN.match(email) else None
+
+def _subscribe_many(emails):
+    # One multi-row INSERT ... ON CONFLICT DO NOTHING; returns how many were new.
+    now = datetime.utcnow()
+    return db.session.execute(insert_ignore(
+        NewsletterSubscription,
+        [{'email': email, 'subscribed_at': now} for email in emails],
+        [db.func.lower(NewsletterSubscription.email)]
+    )).rowcount
+
 @newsletter_bp.route('/subscribe', methods=['POST'])
+@limiter.limit('10/hour', burst=3)
 def subscribe_newsletter():
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        email = data.get('email')
-        if not email:
+        if not data.get('email'):
             return jsonify({'error': 'Email is required'}), 400
+        email = _normalize_email(data.get('email'))
+        if not email:
+            return jsonify({'error': 'Invalid email address'}), 400
 
-        if NewsletterSubscription.query.filter_by(email=email).first():
-            return jsonify({'error': 'Email already subscribed'}), 400
-
-        subscription = NewsletterSubscription(
-            email=email,
-            subscribed_at=datetime.utcnow()
-        )
-        db.session.add(subscription)
+        inserted = _subscribe_many([email])
         db.session.commit()
+        if not inserted:
+            return jsonify({'error': 'Email already subscribed'}), 400
         return jsonify({'message': 'Subscribed successfully'}), 201
     except Exception as e:
         logging.error(f"Error creating subscription: {str(e)}")
@@ -43,16 +63,156 @@ def get_subscriptions():
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        subscriptions = NewsletterSubscription.query.order_by(NewsletterSubscription.subscribed_at.desc()).all()
+        query = NewsletterSubscription.query.order_by(NewsletterSubscription.subscribed_at.desc(), NewsletterSubscription.id.desc())
+        return list_response(query, lambda s: {
+            'id': s.id,
+            'email': s.email,
+            'subscribed_at': s.subscribed_at.isoformat()
+        }, 'subscriptions')
+    except Exception as e:
+        logging.error(f"Error fetching subscriptions: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@newsletter_bp.route('/export.csv', methods=['GET'])
+@jwt_required()
+def export_subscriptions():
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        try:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'), end_of_day=True)
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO 8601, e.g. 2024-07-01'}), 400
+
+        query = NewsletterSubscription.query.with_entities(NewsletterSubscription.email, NewsletterSubscription.subscribed_at)
+        if start:
+            query = query.filter(NewsletterSubscription.subscribed_at >= start)
+        if end:
+            query = query.filter(NewsletterSubscription.subscribed_at < end)
+        query = query.order_by(NewsletterSubscription.subscribed_at, NewsletterSubscription.id)
+        return stream_csv(
+            query,
+            ['email', 'subscribed_at'],
+            lambda s: [s.email, s.subscribed_at.isoformat() if s.subscribed_at else ''],
+            f"newsletter-subscribers-{datetime.utcnow():%Y%m%d}.csv"
+        )
+    except Exception as e:
+        logging.error(f"Error exporting subscriptions: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@newsletter_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_subscriptions():
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        if 'file' in request.files:
+            stream = request.files['file'].stream
+        elif request.mimetype == 'text/csv':
+            stream = request.stream
+        else:
+            return jsonify({'error': 'Upload a CSV as "file" or send it with Content-Type text/csv'}), 400
+
+        # Read the CSV row by row: an "email" column if there is a header, else the first column.
+        reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace'))
+        column = 0
+        received = invalid = inserted = 0
+        batch = set()
+        for line_number, row in enumerate(reader):
+            if not row:
+                continue
+            if line_number == 0:
+                header = [cell.strip().lower() for cell in row]
+                if 'email' in header:
+                    column = header.index('email')
+                    continue
+            received += 1
+            email = _normalize_email(row[column] if column < len(row) else None)
+            if not email:
+                invalid += 1
+                continue
+            batch.add(email)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                inserted += _subscribe_many(batch)
+                db.session.commit()
+                batch = set()
+        if batch:
+            inserted += _subscribe_many(batch)
+            db.session.commit()
+        logging.info(f"Newsletter import: {received} rows, {inserted} new, {invalid} invalid")
         return jsonify({
-            'subscriptions': [{
-                'id': s.id,
-                'email': s.email,
-                'subscribed_at': s.subscribed_at.isoformat()
-            } for s in subscriptions]
+            'received': received,
+            'inserted': inserted,
+            'duplicates': received - invalid - inserted,
+            'invalid': invalid
         }), 200
     except Exception as e:
-        logging.error(f"Error fetching subscriptions: {str(e)}")
+        logging.error(f"Error importing subscriptions: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@newsletter_bp.route('/campaigns', methods=['POST'])
+@jwt_required()
+def create_campaign():
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        data = request.get_json()
+        if not data or not data.get('subject') or not data.get('text'):
+            return jsonify({'error': 'Subject and text are required'}), 400
+
+        campaign = NewsletterCampaign(subject=data['subject'], body_text=data['text'], body_html=data.get('html'))
+        db.session.add(campaign)
+        db.session.commit()
+        return jsonify({'message': 'Campaign created successfully', 'id': campaign.id}), 201
+    except Exception as e:
+        logging.error(f"Error creating campaign: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@newsletter_bp.route('/campaigns/<int:id>', methods=['GET'])
+@jwt_required()
+def get_campaign(id):
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        campaign = db.session.get(NewsletterCampaign, id)
+        if campaign is None:
+            return jsonify({'error': 'Campaign not found'}), 404
+        return jsonify(progress(campaign)), 200
+    except Exception as e:
+        logging.error(f"Error fetching campaign {id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@newsletter_bp.route('/campaigns/<int:id>/send', methods=['POST'])
+@jwt_required()
+def send_campaign_slice(id):
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'Admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        data = request.get_json(silent=True) or {}
+        # One time-boxed slice per request so a serverless invocation never times out;
+        # call again (or run `flask send-newsletter`) until the status is 'sent'.
+        max_seconds = max(1, min(float(data.get('max_seconds', 20)), 50))
+        try:
+            campaign = send_campaign(id, max_seconds=max_seconds, resume=bool(data.get('resume')))
+        except CampaignBusy:
+            return jsonify({'error': 'Campaign not found, already sent or currently sending'}), 409
+        return jsonify(progress(campaign)), 200
+    except Exception as e:
+        logging.error(f"Error sending campaign {id}: {str(e)}")
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @newsletter_bp.route('/<int:id>', methods=['DELETE'])
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
-from app import db
+from app import db, limiter
 from app.models import Partnership
+from app.listing import list_response
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt
 import logging
@@ -22,6 +23,7 @@ def partnership_info():
         return jsonify({'error': str(e)}), 500
 
 @partnership_bp.route('', methods=['POST'])
+@limiter.limit('5/hour', burst=2)
 def submit_partnership():
     try:
         data = request.get_json()
@@ -57,16 +59,14 @@ def get_partnerships():
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        partnerships = Partnership.query.order_by(Partnership.created_at.desc()).all()
-        return jsonify({
-            'partnerships': [{
-                'id': p.id,
-                'organization': p.organization,
-                'email': p.email,
-                'message': p.message,
-                'created_at': p.created_at.isoformat()
-            } for p in partnerships]
-        }), 200
+        query = Partnership.query.order_by(Partnership.created_at.desc(), Partnership.id.desc())
+        return list_response(query, lambda p: {
+            'id': p.id,
+            'organization': p.organization,
+            'email': p.email,
+            'message': p.message,
+            'created_at': p.created_at.isoformat()
+        }, 'partnerships')
     except Exception as e:
         logging.error(f"Error fetching partnerships: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
-from app import db
-from app.models import Testimonial, User
+from flask import Blueprint, request, jsonify, make_response
+from app import db, cache, limiter
+from app.models import Testimonial
+from app.pagination import load_in_order
+from app.conditional import make_etag, not_modified, with_validators, revalidate
 from flask_jwt_extended import jwt_required, get_jwt
 import logging
 
@@ -9,6 +11,7 @@ testimonial_bp = Blueprint('testimonial_main', __name__)
 logging.basicConfig(level=logging.DEBUG)
 
 @testimonial_bp.route('', methods=['POST'])
+@limiter.limit('5/hour', burst=2)
 def create_testimonial():
     try:
         data = request.get_json()
@@ -22,6 +25,7 @@ def create_testimonial():
         testimonial = Testimonial(name=name, content=content, location=location)
         db.session.add(testimonial)
         db.session.commit()
+        cache.invalidate('testimonial:list')
         return jsonify({'message': 'Testimonial submitted successfully', 'id': testimonial.id}), 201
     except Exception as e:
         logging.error(f"Error creating testimonial: {str(e)}")
@@ -29,31 +33,47 @@ def create_testimonial():
         return jsonify({'error': str(e)}), 500
 
 @testimonial_bp.route('', methods=['GET'])
+@cache.cached(tags=lambda: ['testimonial:list'])
 def get_testimonials():
     try:
-        testimonials = Testimonial.query.order_by(Testimonial.created_at.desc()).all()
-        return jsonify([{
+        keys = Testimonial.query.with_entities(Testimonial.id, Testimonial.updated_at).order_by(Testimonial.created_at.desc(), Testimonial.id.desc()).all()
+        etag = make_etag('testimonials', [tuple(r) for r in keys])
+        cached = not_modified(etag)
+        if cached:
+            return revalidate(cached)
+        testimonials = load_in_order(Testimonial.query, Testimonial.id, [r.id for r in keys])
+        response = make_response(jsonify([{
             'id': t.id,
             'name': t.name,
             'content': t.content,
             'location': t.location,
             'created_at': t.created_at.isoformat()
-        } for t in testimonials]), 200
+        } for t in testimonials]))
+        return revalidate(with_validators(response, etag)), 200
     except Exception as e:
         logging.error(f"Error fetching testimonials: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @testimonial_bp.route('/<int:id>', methods=['GET'])
+@cache.cached(tags=lambda id: [f'testimonial:item:{id}'])
 def get_testimonial(id):
     try:
+        updated_at = db.session.query(Testimonial.updated_at).filter_by(id=id).scalar()
+        if updated_at is None:
+            return jsonify({'error': 'Testimonial not found'}), 404
+        etag = make_etag('testimonial', id, updated_at)
+        cached = not_modified(etag, updated_at)
+        if cached:
+            return revalidate(cached)
         testimonial = Testimonial.query.get_or_404(id)
-        return jsonify({
+        response = make_response(jsonify({
             'id': testimonial.id,
             'name': testimonial.name,
             'content': testimonial.content,
             'location': testimonial.location,
             'created_at': testimonial.created_at.isoformat()
-        }), 200
+        }))
+        return revalidate(with_validators(response, etag, updated_at)), 200
     except Exception as e:
         logging.error(f"Error fetching testimonial {id}: {str(e)}")
         return jsonify({'error': str(e)}), 404
@@ -73,6 +93,7 @@ def update_testimonial(id):
         testimonial.content = data.get('content', testimonial.content)
         testimonial.location = data.get('location', testimonial.location)
         db.session.commit()
+        cache.invalidate('testimonial:list', f'testimonial:item:{id}')
         return jsonify({'message': 'Testimonial updated successfully'}), 200
     except Exception as e:
         logging.error(f"Error updating testimonial {id}: {str(e)}")
@@ -90,6 +111,7 @@ def delete_testimonial(id):
         testimonial = Testimonial.query.get_or_404(id)
         db.session.delete(testimonial)
         db.session.commit()
+        cache.invalidate('testimonial:list', f'testimonial:item:{id}')
         return jsonify({'message': 'Testimonial deleted successfully'}), 200
     except Exception as e:
         logging.error(f"Error deleting testimonial {id}: {str(e)}")
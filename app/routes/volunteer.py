@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
-from app import db
+from app import db, limiter
 from app.models import Volunteer, User
+from app.listing import list_response
 from flask_jwt_extended import jwt_required, get_jwt
 import logging
 
@@ -9,6 +10,7 @@ volunteer_bp = Blueprint('volunteer_main', __name__)
 logging.basicConfig(level=logging.DEBUG)
 
 @volunteer_bp.route('', methods=['POST'])
+@limiter.limit('5/hour', burst=2)
 def create_volunteer():
     try:
         data = request.get_json()
@@ -36,14 +38,14 @@ def get_volunteers():
         if claims.get('role') != 'Admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        volunteers = Volunteer.query.all()
-        return jsonify([{
+        query = Volunteer.query.order_by(Volunteer.created_at.desc(), Volunteer.id.desc())
+        return list_response(query, lambda v: {
             'id': v.id,
             'name': v.name,
             'email': v.email,
             'skills': v.skills,
             'created_at': v.created_at.isoformat()
-        } for v in volunteers]), 200
+        }, 'volunteers', bare=True)
     except Exception as e:
         logging.error(f"Error fetching volunteers: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
\ No newline at end of file
@@ -0,0 +1,173 @@
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.summary import plain_text
+import click
+import html
+import logging
+import re
+
+# source -> (table, title column, body column)
+SEARCH_SOURCES = {
+    'blog_post': ('blog_post', 'title', 'content'),
+    'content': ('content', 'title', 'body'),
+}
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# The database brackets matches with these control characters; the text around
+# them is escaped before they become the only markup in the result.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _fts_query(q):
+    # Quote every term so user input can never be parsed as FTS5 syntax; the
+    # last term is a prefix match to support search-as-you-type.
+    terms = re.findall(r'\w+', q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _highlighted(text, unescape=False):
+    text = html.unescape(text or '') if unescape else (text or '')
+    return html.escape(text, quote=False).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+
+def ensure_schema():
+    dialect = _dialect()
+    for source, (table, _, _) in SEARCH_SOURCES.items():
+        if dialect == 'sqlite':
+            db.session.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(title, body, tokenize='porter unicode61')"
+            ))
+        elif dialect == 'postgresql':
+            db.session.execute(text(
+                f'CREATE TABLE IF NOT EXISTS {table}_search ('
+                f'id INTEGER PRIMARY KEY REFERENCES {table} (id) ON DELETE CASCADE, document TSVECTOR NOT NULL)'
+            ))
+            db.session.execute(text(
+                f'CREATE INDEX IF NOT EXISTS ix_{table}_search_document ON {table}_search USING GIN (document)'
+            ))
+
+
+def _write(source, statements):
+    # A savepoint keeps an index failure from aborting the caller's transaction.
+    try:
+        with db.session.begin_nested():
+            for statement, params in statements:
+                db.session.execute(text(statement), params)
+    except SQLAlchemyError as e:
+        logging.error(f"Error updating {source} search index: {str(e)}")
+
+
+def index_document(source, id, title, body):
+    """Add or replace one document; call before the surrounding commit.
+
+    Only the text is indexed, so markup never turns up in a snippet.
+    """
+    table = SEARCH_SOURCES[source][0]
+    params = {'id': id, 'title': plain_text(title), 'body': plain_text(body)}
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        _write(source, [
+            (f'DELETE FROM {table}_fts WHERE rowid = :id', {'id': id}),
+            (f'INSERT INTO {table}_fts (rowid, title, body) VALUES (:id, :title, :body)', params),
+        ])
+    elif dialect == 'postgresql':
+        _write(source, [(
+            f'INSERT INTO {table}_search (id, document) VALUES (:id, '
+            f"setweight(to_tsvector('english', :title), 'A') || setweight(to_tsvector('english', :body), 'B')) "
+            f'ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document',
+            params
+        )])
+
+
+def remove_document(source, id):
+    table = SEARCH_SOURCES[source][0]
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        _write(source, [(f'DELETE FROM {table}_fts WHERE rowid = :id', {'id': id})])
+    elif dialect == 'postgresql':
+        _write(source, [(f'DELETE FROM {table}_search WHERE id = :id', {'id': id})])
+
+
+def search(source, q, limit, offset):
+    """Run a ranked full-text query.
+
+    Returns ``(total, hits)`` where each hit is ``(id, rank, title, snippet)``
+    with matches wrapped in ``<mark>`` tags, best match first. Title and
+    snippet are HTML-escaped, so ``<mark>`` is the only markup in them.
+    """
+    table, title_col, body_col = SEARCH_SOURCES[source]
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        match = _fts_query(q)
+        if match is None:
+            return 0, []
+        total = db.session.execute(
+            text(f'SELECT COUNT(*) FROM {table}_fts WHERE {table}_fts MATCH :q'), {'q': match}
+        ).scalar()
+        hits = db.session.execute(text(
+            f'SELECT rowid, bm25({table}_fts, 10.0, 1.0) AS rank, '
+            f'highlight({table}_fts, 0, :start, :end), '
+            f"snippet({table}_fts, 1, :start, :end, '…', 24) "
+            f'FROM {table}_fts WHERE {table}_fts MATCH :q ORDER BY rank LIMIT :limit OFFSET :offset'
+        ), {'q': match, 'start': MATCH_START, 'end': MATCH_END, 'limit': limit, 'offset': offset}).all()
+        # bm25() is lower-is-better; flip it so callers always see higher-is-better.
+        return total, [(id, -rank, _highlighted(title), _highlighted(snippet)) for id, rank, title, snippet in hits]
+    if dialect == 'postgresql':
+        query = "websearch_to_tsquery('english', :q)"
+        total = db.session.execute(
+            text(f'SELECT COUNT(*) FROM {table}_search WHERE document @@ {query}'), {'q': q}
+        ).scalar()
+        options = f'StartSel={MATCH_START}, StopSel={MATCH_END}'
+        # The headline is cut from the stored column, so strip its tags here and its
+        # entities in _highlighted, matching what index_document indexed.
+        hits = db.session.execute(text(
+            f'SELECT s.id, ts_rank_cd(s.document, {query}) AS rank, '
+            f"ts_headline('english', t.{title_col}, {query}, :title_options), "
+            f"ts_headline('english', regexp_replace(t.{body_col}, '<[^>]+>', ' ', 'g'), {query}, :body_options) "
+            f'FROM {table}_search s JOIN {table} t ON t.id = s.id '
+            f'WHERE s.document @@ {query} ORDER BY rank DESC, s.id DESC LIMIT :limit OFFSET :offset'
+        ), {
+            'q': q, 'limit': limit, 'offset': offset,
+            'title_options': f'{options}, HighlightAll=true',
+            'body_options': f'{options}, MaxFragments=2, MaxWords=30'
+        }).all()
+        return total, [
+            (id, rank, _highlighted(title, unescape=True), _highlighted(snippet, unescape=True))
+            for id, rank, title, snippet in hits
+        ]
+    raise NotImplementedError(f'Full-text search is not supported on {dialect}')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Create the full-text index tables and reindex every post and content item."""
+    from app.models import BlogPost, Content
+    ensure_schema()
+    dialect = _dialect()
+    for source, model, body_attr in (('blog_post', BlogPost, 'content'), ('content', Content, 'body')):
+        table = SEARCH_SOURCES[source][0]
+        db.session.execute(text(f'DELETE FROM {table}_fts' if dialect == 'sqlite' else f'DELETE FROM {table}_search'))
+        count, last_id = 0, 0
+        while True:
+            rows = (db.session.query(model.id, model.title, getattr(model, body_attr))
+                    .filter(model.id > last_id).order_by(model.id).limit(500).all())
+            if not rows:
+                break
+            for id, title, body in rows:
+                index_document(source, id, title, body)
+            db.session.commit()
+            count += len(rows)
+            last_id = rows[-1][0]
+        click.echo(f"Indexed {count} {source} rows")
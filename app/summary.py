@@ -0,0 +1,27 @@
+import html
+import math
+import re
+
+EXCERPT_LENGTH = 280
+WORDS_PER_MINUTE = 200
+
+_TAG = re.compile(r'<[^>]+>')
+_SPACE = re.compile(r'\s+')
+
+
+def plain_text(text):
+    # Post bodies may carry markup from the editor; teasers and word counts use the text only.
+    return _SPACE.sub(' ', html.unescape(_TAG.sub(' ', text or ''))).strip()
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    text = plain_text(text)
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' .,;:-') + '…'
+
+
+def reading_minutes(text):
+    """Estimated reading time in whole minutes, at least one."""
+    return max(1, math.ceil(len(plain_text(text).split()) / WORDS_PER_MINUTE))
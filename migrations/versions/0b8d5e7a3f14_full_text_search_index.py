@@ -0,0 +1,58 @@
+"""Full-text search index
+
+Revision ID: 0b8d5e7a3f14
+Revises: f2c7a4e06b91
+Create Date: 2026-10-17 17:05:42.118306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.summary import plain_text
+
+
+# revision identifiers, used by Alembic.
+revision = '0b8d5e7a3f14'
+down_revision = 'f2c7a4e06b91'
+branch_labels = None
+depends_on = None
+
+
+SOURCES = (('blog_post', 'content'), ('content', 'body'))
+
+
+def _backfill(conn, table, body, insert):
+    # Index the text only, as app.search.index_document does, so editor markup never matches or shows in snippets.
+    rows = conn.execute(sa.text(f'SELECT id, title, {body} FROM {table}')).fetchall()
+    for id, title, text in rows:
+        conn.execute(sa.text(insert), {'id': id, 'title': plain_text(title), 'body': plain_text(text)})
+
+
+def upgrade():
+    # IF NOT EXISTS: create_app also creates these tables on startup (app.search.ensure_schema),
+    # so they may already be there, empty or stale, by the time this runs.
+    dialect = op.get_bind().dialect.name
+    for table, body in SOURCES:
+        if dialect == 'sqlite':
+            op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(title, body, tokenize='porter unicode61')")
+            op.execute(f'DELETE FROM {table}_fts')
+            _backfill(op.get_bind(), table, body, f'INSERT INTO {table}_fts (rowid, title, body) VALUES (:id, :title, :body)')
+        elif dialect == 'postgresql':
+            op.execute(
+                f'CREATE TABLE IF NOT EXISTS {table}_search ('
+                f'id INTEGER PRIMARY KEY REFERENCES {table} (id) ON DELETE CASCADE, document TSVECTOR NOT NULL)'
+            )
+            op.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_search_document ON {table}_search USING GIN (document)')
+            op.execute(f'DELETE FROM {table}_search')
+            _backfill(op.get_bind(), table, body, (
+                f'INSERT INTO {table}_search (id, document) VALUES (:id, '
+                f"setweight(to_tsvector('english', :title), 'A') || setweight(to_tsvector('english', :body), 'B'))"
+            ))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, _ in SOURCES:
+        if dialect == 'sqlite':
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP TABLE IF EXISTS {table}_search')
@@ -0,0 +1,35 @@
+"""Blog post comment/like counters
+
+Revision ID: 3b1f6c2d9a40
+Revises: e956a458a38c
+Create Date: 2026-10-17 09:12:03.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2d9a40'
+down_revision = 'e956a458a38c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the existing rows so the counters start out consistent.
+    op.execute(
+        'UPDATE blog_post SET '
+        'comment_count = (SELECT COUNT(*) FROM comment WHERE comment.post_id = blog_post.id), '
+        'like_count = (SELECT COUNT(*) FROM "like" WHERE "like".post_id = blog_post.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.drop_column('like_count')
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,48 @@
+"""Excerpt and reading time for blog posts and content
+
+Revision ID: 5e2f9c1d7a36
+Revises: 0b8d5e7a3f14
+Create Date: 2026-10-17 17:48:31.562270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.summary import EXCERPT_LENGTH, make_excerpt, reading_minutes
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2f9c1d7a36'
+down_revision = '0b8d5e7a3f14'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(conn, table, column):
+    rows = conn.execute(sa.text(f'SELECT id, {column} FROM {table}')).fetchall()
+    for id, text in rows:
+        conn.execute(
+            sa.text(f'UPDATE {table} SET excerpt = :excerpt, reading_time = :reading_time WHERE id = :id'),
+            {'excerpt': make_excerpt(text), 'reading_time': reading_minutes(text), 'id': id}
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH + 1), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=EXCERPT_LENGTH + 1), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+
+    conn = op.get_bind()
+    _backfill(conn, 'blog_post', 'content')
+    _backfill(conn, 'content', 'body')
+
+
+def downgrade():
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('excerpt')
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('excerpt')
@@ -0,0 +1,28 @@
+"""Blog post keyset pagination indexes
+
+Revision ID: 7c4e2a91d5b3
+Revises: 3b1f6c2d9a40
+Create Date: 2026-10-17 10:02:41.550917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2a91d5b3'
+down_revision = '3b1f6c2d9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.create_index('ix_blog_post_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_blog_post_category_created_at_id', ['category', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.drop_index('ix_blog_post_category_created_at_id')
+        batch_op.drop_index('ix_blog_post_created_at_id')
@@ -0,0 +1,30 @@
+"""Donation listing indexes
+
+Revision ID: 8a41c6e2d0f9
+Revises: 5e2f9c1d7a36
+Create Date: 2026-10-17 18:26:03.740915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41c6e2d0f9'
+down_revision = '5e2f9c1d7a36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_donation_frequency_created_at_id', ['frequency', 'created_at', 'id'], unique=False)
+    op.create_index('ix_donation_email_lower', 'donation', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_donation_email_lower', table_name='donation')
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_frequency_created_at_id')
+        batch_op.drop_index('ix_donation_created_at_id')
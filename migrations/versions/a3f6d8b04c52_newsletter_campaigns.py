@@ -0,0 +1,37 @@
+"""Newsletter campaigns
+
+Revision ID: a3f6d8b04c52
+Revises: f8c3b6d21e07
+Create Date: 2026-10-17 22:04:51.660293
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f6d8b04c52'
+down_revision = 'f8c3b6d21e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('newsletter_campaign',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body_html', sa.Text(), nullable=True),
+    sa.Column('body_text', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default='draft', nullable=False),
+    sa.Column('last_subscriber_id', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('sent_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('failed_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('newsletter_campaign')
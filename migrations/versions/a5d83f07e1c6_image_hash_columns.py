@@ -0,0 +1,46 @@
+"""Image hash columns for blog posts and content
+
+Revision ID: a5d83f07e1c6
+Revises: 7c4e2a91d5b3
+Create Date: 2026-10-17 11:20:17.903364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d83f07e1c6'
+down_revision = '7c4e2a91d5b3'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(conn, table):
+    ids = [row[0] for row in conn.execute(sa.text(f'SELECT id FROM {table} WHERE image_data IS NOT NULL'))]
+    # One blob at a time so the backfill never holds more than a single image in memory.
+    for id in ids:
+        data = conn.execute(sa.text(f'SELECT image_data FROM {table} WHERE id = :id'), {'id': id}).scalar()
+        conn.execute(
+            sa.text(f'UPDATE {table} SET image_hash = :hash WHERE id = :id'),
+            {'hash': hashlib.sha256(data).hexdigest(), 'id': id}
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_hash', sa.String(length=64), nullable=True))
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_hash', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    _backfill(conn, 'blog_post')
+    _backfill(conn, 'content')
+
+
+def downgrade():
+    with op.batch_alter_table('content', schema=None) as batch_op:
+        batch_op.drop_column('image_hash')
+    with op.batch_alter_table('blog_post', schema=None) as batch_op:
+        batch_op.drop_column('image_hash')
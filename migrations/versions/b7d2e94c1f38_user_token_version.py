@@ -0,0 +1,26 @@
+"""User token version
+
+Revision ID: b7d2e94c1f38
+Revises: a3f6d8b04c52
+Create Date: 2026-10-17 23:12:40.318526
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e94c1f38'
+down_revision = 'a3f6d8b04c52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
@@ -0,0 +1,47 @@
+"""Donation rollups
+
+Revision ID: b93d0e4c6a27
+Revises: 8a41c6e2d0f9
+Create Date: 2026-10-17 19:02:55.318640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b93d0e4c6a27'
+down_revision = '8a41c6e2d0f9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('donation_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('frequency', sa.String(length=50), nullable=False),
+    sa.Column('recognition', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Float(), server_default='0', nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period', 'bucket', 'frequency', 'recognition', name='uq_donation_rollup_bucket')
+    )
+
+    # Backfill straight from the donation table; `flask rebuild-donation-rollups` does the same later.
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        day, month = "date_trunc('day', created_at)::date", "date_trunc('month', created_at)::date"
+    else:
+        day, month = 'date(created_at)', "date(created_at, 'start of month')"
+    for period, bucket in (('day', day), ('month', month)):
+        op.execute(
+            f"INSERT INTO donation_rollup (period, bucket, frequency, recognition, total, count) "
+            f"SELECT '{period}', {bucket}, frequency, recognition, SUM(amount), COUNT(*) FROM donation "
+            f"WHERE created_at IS NOT NULL GROUP BY {bucket}, frequency, recognition"
+        )
+
+
+def downgrade():
+    op.drop_table('donation_rollup')
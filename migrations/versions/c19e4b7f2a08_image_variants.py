@@ -0,0 +1,43 @@
+"""Responsive image variants
+
+Revision ID: c19e4b7f2a08
+Revises: a5d83f07e1c6
+Create Date: 2026-10-17 12:41:55.271630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c19e4b7f2a08'
+down_revision = 'a5d83f07e1c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_variant',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=True),
+    sa.Column('content_id', sa.Integer(), nullable=True),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('mimetype', sa.String(length=50), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['content_id'], ['content.id'], ),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_post.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('image_variant', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_image_variant_content_id'), ['content_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_image_variant_post_id'), ['post_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('image_variant', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_variant_post_id'))
+        batch_op.drop_index(batch_op.f('ix_image_variant_content_id'))
+
+    op.drop_table('image_variant')
@@ -0,0 +1,45 @@
+"""Donation status
+
+Revision ID: c7e1a9f53b80
+Revises: b93d0e4c6a27
+Create Date: 2026-10-17 19:41:12.906533
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1a9f53b80'
+down_revision = 'b93d0e4c6a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN: a batch rebuild of donation would trip over the lower(email) index on SQLite.
+    op.add_column('donation', sa.Column('status', sa.String(length=20), server_default='pending', nullable=False))
+    op.add_column('donation', sa.Column('verified_at', sa.DateTime(), nullable=True))
+
+    # Existing rollups all describe unconfirmed donations, which the server default records.
+    with op.batch_alter_table('donation_rollup', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='pending', nullable=False))
+        batch_op.drop_constraint('uq_donation_rollup_bucket', type_='unique')
+        batch_op.create_unique_constraint('uq_donation_rollup_bucket', ['period', 'bucket', 'frequency', 'recognition', 'status'])
+
+
+def downgrade():
+    # Fold the per-status rows back together before the status column goes away.
+    op.execute(
+        "INSERT INTO donation_rollup (period, bucket, frequency, recognition, status, total, count) "
+        "SELECT period, bucket, frequency, recognition, '', SUM(total), SUM(count) FROM donation_rollup "
+        "GROUP BY period, bucket, frequency, recognition"
+    )
+    op.execute("DELETE FROM donation_rollup WHERE status <> ''")
+    with op.batch_alter_table('donation_rollup', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_donation_rollup_bucket', type_='unique')
+        batch_op.create_unique_constraint('uq_donation_rollup_bucket', ['period', 'bucket', 'frequency', 'recognition'])
+        batch_op.drop_column('status')
+
+    op.drop_column('donation', 'verified_at')
+    op.drop_column('donation', 'status')
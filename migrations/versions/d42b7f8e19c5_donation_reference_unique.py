@@ -0,0 +1,31 @@
+"""Unique donation transaction reference
+
+Revision ID: d42b7f8e19c5
+Revises: c7e1a9f53b80
+Create Date: 2026-10-17 20:15:48.227091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd42b7f8e19c5'
+down_revision = 'c7e1a9f53b80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        'SELECT paystack_transaction_ref FROM donation GROUP BY paystack_transaction_ref HAVING COUNT(*) > 1'
+    )).scalars().all()
+    if duplicates:
+        # Donations are financial records, so they are never merged or dropped automatically.
+        raise RuntimeError(f"Resolve duplicate donation references before upgrading: {', '.join(duplicates[:20])}")
+    op.create_index('ux_donation_paystack_transaction_ref', 'donation', ['paystack_transaction_ref'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_donation_paystack_transaction_ref', table_name='donation')
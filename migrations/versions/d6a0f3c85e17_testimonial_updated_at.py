@@ -0,0 +1,28 @@
+"""Testimonial updated_at
+
+Revision ID: d6a0f3c85e17
+Revises: c19e4b7f2a08
+Create Date: 2026-10-17 14:05:32.684120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a0f3c85e17'
+down_revision = 'c19e4b7f2a08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('testimonial', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE testimonial SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('testimonial', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
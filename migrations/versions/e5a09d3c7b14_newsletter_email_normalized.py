@@ -0,0 +1,30 @@
+"""Normalized newsletter emails
+
+Revision ID: e5a09d3c7b14
+Revises: d42b7f8e19c5
+Create Date: 2026-10-17 20:52:37.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a09d3c7b14'
+down_revision = 'd42b7f8e19c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the earliest subscription for each normalized address, then normalize the rest.
+    op.execute(
+        'DELETE FROM newsletter_subscription WHERE id NOT IN ('
+        'SELECT MIN(id) FROM newsletter_subscription GROUP BY lower(trim(email)))'
+    )
+    op.execute('UPDATE newsletter_subscription SET email = lower(trim(email))')
+    op.create_index('ux_newsletter_subscription_email_lower', 'newsletter_subscription', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_newsletter_subscription_email_lower', table_name='newsletter_subscription')
@@ -0,0 +1,35 @@
+"""Unique like per post and IP address
+
+Revision ID: e83b5d19c4f2
+Revises: d6a0f3c85e17
+Create Date: 2026-10-17 15:37:48.209551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83b5d19c4f2'
+down_revision = 'd6a0f3c85e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicates left by the old check-then-insert toggle, keeping the first like.
+    op.execute(
+        'DELETE FROM "like" WHERE id NOT IN '
+        '(SELECT MIN(id) FROM "like" GROUP BY post_id, ip_address)'
+    )
+    op.execute(
+        'UPDATE blog_post SET like_count = '
+        '(SELECT COUNT(*) FROM "like" WHERE "like".post_id = blog_post.id)'
+    )
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.create_index('ux_like_post_id_ip_address', ['post_id', 'ip_address'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.drop_index('ux_like_post_id_ip_address')
@@ -0,0 +1,26 @@
+"""Comment feed index
+
+Revision ID: f2c7a4e06b91
+Revises: e83b5d19c4f2
+Create Date: 2026-10-17 16:22:09.471805
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a4e06b91'
+down_revision = 'e83b5d19c4f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_post_id_created_at_id', ['post_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_post_id_created_at_id')
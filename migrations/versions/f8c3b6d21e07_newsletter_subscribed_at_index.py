@@ -0,0 +1,24 @@
+"""Newsletter subscribed_at index
+
+Revision ID: f8c3b6d21e07
+Revises: e5a09d3c7b14
+Create Date: 2026-10-17 21:18:09.835412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8c3b6d21e07'
+down_revision = 'e5a09d3c7b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_newsletter_subscription_subscribed_at_id', 'newsletter_subscription', ['subscribed_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_newsletter_subscription_subscribed_at_id', table_name='newsletter_subscription')
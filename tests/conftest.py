@@ -0,0 +1,43 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.identity import _users, token_claims
+from app.models import User
+from app.revocation import revocations
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('JWT_SECRET_KEY', 'test-jwt-secret-key-of-reasonable-length')
+    monkeypatch.setenv('IMAGE_WORKERS', '0')
+    monkeypatch.setenv('BCRYPT_LOG_ROUNDS', '4')
+    # As deployed: one proxy in front of the app appends the client address.
+    monkeypatch.setenv('PROXY_FIX_X_FOR', '1')
+    app = create_app()
+    app.config['TESTING'] = True
+    # Process-wide caches outlive a single app; start every test from a clean slate.
+    _users.clear()
+    revocations.clear()
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(app):
+    user = User(email='admin@example.org', password_hash='x', role='Admin')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def admin_headers(admin):
+    token = create_access_token(identity=str(admin.id), additional_claims=token_claims(admin))
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import db
+from app.identity import get_user
+from app.models import RevokedToken
+from app.revocation import revocations
+
+
+def _register(client):
+    response = client.post('/api/auth/register', json={'email': 'donor@example.org', 'password': 'secret'})
+    assert response.status_code == 201
+    return response.json
+
+
+def _refresh(client, token):
+    return client.post('/api/auth/refresh', headers={'Authorization': f'Bearer {token}'})
+
+
+def test_refresh_rotates_token(client):
+    tokens = _register(client)
+    response = _refresh(client, tokens['refresh_token'])
+    assert response.status_code == 200
+    assert _refresh(client, response.json['refresh_token']).status_code == 200
+    assert _refresh(client, tokens['refresh_token']).status_code == 401
+
+
+def test_spent_refresh_token_rejected_before_other_workers_sync(client, monkeypatch):
+    tokens = _register(client)
+    assert _refresh(client, tokens['refresh_token']).status_code == 200
+    # Another worker: the revocation is in the table but not yet in its memory.
+    revocations.clear()
+    monkeypatch.setattr(revocations, '_next_sync', float('inf'))
+    response = _refresh(client, tokens['refresh_token'])
+    assert response.status_code == 401
+    assert response.json == {'error': 'token already used'}
+
+
+def test_user_cache_ttl_comes_from_app_config(app, admin):
+    user_id = admin.id
+    app.config['USER_CACHE_TTL'] = 0
+    assert get_user(user_id).role == 'Admin'
+    # Bypass the ORM so the eviction hook does not run, as for a change made by another worker.
+    db.session.execute(text("UPDATE user SET role = 'Member' WHERE id = :id"), {'id': user_id})
+    db.session.commit()
+    assert get_user(user_id).role == 'Member'
+
+
+def test_revocation_sync_interval_comes_from_app_config(app):
+    app.config['REVOCATION_SYNC_SECONDS'] = 0
+    assert not revocations.is_revoked('other-worker-jti')
+    # Revoked by another worker: only the table knows about it.
+    db.session.add(RevokedToken(jti='other-worker-jti', expires_at=datetime.utcnow() + timedelta(hours=1), revoked_at=datetime.utcnow()))
+    db.session.commit()
+    assert revocations.is_revoked('other-worker-jti')
@@ -0,0 +1,26 @@
+from app import db
+from app.models import Donation
+
+
+def _add(amount, status, reference):
+    db.session.add(Donation(amount=amount, email='donor@example.org', frequency='One-time',
+                            recognition='Private', paystack_transaction_ref=reference, status=status))
+
+
+def test_stats_count_only_successful_donations_by_default(client, admin_headers):
+    _add(30, 'success', 'ref-1')
+    _add(5, 'success', 'ref-2')
+    _add(10, 'pending', 'ref-3')
+    _add(20, 'failed', 'ref-4')
+    _add(35, 'abandoned', 'ref-5')
+    db.session.commit()
+
+    response = client.get('/api/donation/stats', headers=admin_headers)
+    assert response.status_code == 200
+    assert (response.json['total'], response.json['count']) == (35, 2)
+
+    response = client.get('/api/donation/stats?status=all', headers=admin_headers)
+    assert (response.json['total'], response.json['count']) == (100, 5)
+
+    response = client.get('/api/donation/stats?status=pending', headers=admin_headers)
+    assert (response.json['total'], response.json['count']) == (10, 1)
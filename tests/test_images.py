@@ -0,0 +1,48 @@
+from PIL import Image
+from app import images
+from app.routes import content as content_routes
+import io
+import pytest
+
+
+def test_pool_settings_come_from_app_config(app, monkeypatch):
+    monkeypatch.setattr(images, '_settings', None)
+    app.config['IMAGE_WORKERS'] = 0
+    # A lambda cannot be sent to a worker process, so this only works inline.
+    assert images.run_in_pool(lambda value: value + 1, 1) == 2
+    assert images._pool_settings() == (0, app.config['IMAGE_TIMEOUT'])
+
+
+def _png(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(output, 'PNG')
+    return output.getvalue()
+
+
+def _upload(client, headers, data):
+    form = {'title': 'About', 'body': 'Text', 'category': 'about', 'image': (io.BytesIO(data), 'about.png', 'image/png')}
+    return client.post('/api/content', headers=headers, data=form, content_type='multipart/form-data')
+
+
+def test_content_upload_rejects_truncated_image(client, admin_headers):
+    response = _upload(client, admin_headers, _png(800, 600)[:500])
+    assert response.status_code == 400
+
+
+def test_content_upload_when_pipeline_busy(client, admin_headers, monkeypatch):
+    def busy(data):
+        raise images.ImagePipelineBusy('Image processing is busy, try again shortly')
+    monkeypatch.setattr(content_routes, 'make_variants', busy)
+    assert _upload(client, admin_headers, _png(800, 600)).status_code == 503
+
+
+@pytest.mark.skipif('image/webp' not in [images.FORMAT_MIMETYPES[f] for f in images.variant_formats()], reason='no WebP encoder')
+def test_image_without_width_is_negotiated_on_accept(client, admin_headers):
+    assert _upload(client, admin_headers, _png(800, 600)).status_code == 201
+    response = client.get('/api/content/image/1', headers={'Accept': 'image/webp,image/*'})
+    assert response.mimetype in ('image/webp', 'image/avif')
+    assert Image.open(io.BytesIO(response.data)).width == 800
+    # Wider than the source: still the full-width encode, not the original.
+    assert client.get('/api/content/image/1?w=2000', headers={'Accept': 'image/webp'}).mimetype == 'image/webp'
+    # Clients that name no modern format get the original.
+    assert client.get('/api/content/image/1', headers={'Accept': '*/*'}).mimetype == 'image/png'
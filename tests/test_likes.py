@@ -0,0 +1,71 @@
+from app import db
+from app.likes import like_buffer
+from app.models import BlogPost
+
+
+def test_buffered_like_at_flush_threshold_reports_fresh_count(client, admin, monkeypatch):
+    post = BlogPost(title='Post', content='<p>Body</p>', category='News', author_id=admin.id)
+    db.session.add(post)
+    db.session.commit()
+    monkeypatch.setattr(like_buffer, 'enabled', True)
+    monkeypatch.setattr(like_buffer, 'size', 1)
+    monkeypatch.setattr(like_buffer, 'interval', 3600)
+
+    response = client.post(f'/api/blog/{post.id}/like')
+    assert response.status_code == 201
+    assert response.json['like_count'] == 1
+    assert like_buffer.pending_delta(post.id) == 0
+    assert db.session.get(BlogPost, post.id).like_count == 1
+
+    response = client.post(f'/api/blog/{post.id}/like')
+    assert response.status_code == 200
+    assert response.json['like_count'] == 0
+
+
+def _enforce_foreign_keys():
+    from sqlalchemy import event
+    # As on Postgres: a like for a deleted post violates its foreign key.
+    event.listen(db.engine, 'connect', lambda conn, record: conn.execute('PRAGMA foreign_keys=ON'))
+    db.session.remove()
+    db.engine.dispose()
+
+
+def _post(author_id, title):
+    post = BlogPost(title=title, content='<p>Body</p>', category='News', author_id=author_id)
+    db.session.add(post)
+    db.session.commit()
+    return post.id
+
+
+def test_deleting_a_post_drops_its_buffered_likes(client, admin, admin_headers, monkeypatch):
+    author_id = admin.id
+    _enforce_foreign_keys()
+    doomed, kept = _post(author_id, 'Doomed'), _post(author_id, 'Kept')
+    monkeypatch.setattr(like_buffer, 'enabled', True)
+    monkeypatch.setattr(like_buffer, 'size', 100)
+    monkeypatch.setattr(like_buffer, 'interval', 3600)
+    monkeypatch.setattr(like_buffer, '_pending', {})
+
+    assert client.post(f'/api/blog/{doomed}/like').status_code == 201
+    assert client.delete(f'/api/blog/{doomed}', headers=admin_headers).status_code == 200
+    assert like_buffer.pending_delta(doomed) == 0
+
+    assert client.post(f'/api/blog/{kept}/like').status_code == 201
+    like_buffer.flush()
+    assert db.session.get(BlogPost, kept).like_count == 1
+
+
+def test_flush_drops_rows_that_violate_constraints_and_keeps_the_rest(admin, monkeypatch):
+    author_id = admin.id
+    _enforce_foreign_keys()
+    kept = _post(author_id, 'Kept')
+    monkeypatch.setattr(like_buffer, '_pending', {})
+    # Another worker's buffer still holds a like for a post deleted after the existence check.
+    monkeypatch.setattr(like_buffer, '_live_posts', lambda post_ids: set(post_ids))
+    like_buffer._pending[(kept, '10.0.0.1')] = {'liked': True}
+    like_buffer._pending[(kept + 1000, '10.0.0.1')] = {'liked': True}
+
+    like_buffer.flush()
+    assert like_buffer.pending_delta(kept) == 0
+    assert like_buffer.pending_delta(kept + 1000) == 0
+    assert db.session.get(BlogPost, kept).like_count == 1
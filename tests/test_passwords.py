@@ -0,0 +1,27 @@
+from app import passwords
+from app.passwords import HashingBusy
+import pytest
+import threading
+
+
+def test_hashing_pool_settings_come_from_app_config(app, monkeypatch):
+    for name in ('_settings', '_executor', '_slots'):
+        monkeypatch.setattr(passwords, name, None)
+    app.config.update(HASH_WORKERS=1, HASH_QUEUE=0, HASH_TIMEOUT=0.05)
+    assert passwords._pool_settings() == (1, 0, 0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    # The one worker is busy and no queue is allowed, so the next caller gets HashingBusy.
+    holder = threading.Thread(target=passwords._run, args=(hold,))
+    holder.start()
+    started.wait(5)
+    try:
+        with pytest.raises(HashingBusy):
+            passwords._run(lambda: None)
+    finally:
+        release.set()
+        holder.join()
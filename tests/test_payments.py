@@ -0,0 +1,63 @@
+from app import db, paystack
+from app.models import Donation
+from app.payments import AMOUNT_MISMATCH, PENDING, SUCCESS, record_transaction, refresh_status
+
+
+def _donation(reference, amount):
+    donation = Donation(amount=amount, email='donor@example.org', frequency='One-time',
+                        recognition='Private', paystack_transaction_ref=reference)
+    db.session.add(donation)
+    db.session.commit()
+    return donation
+
+
+def test_success_with_matching_amount_confirms_donation(app):
+    _donation('ref-ok', 30.0)
+    donation = record_transaction({'reference': 'ref-ok', 'status': 'success', 'amount': 3000, 'currency': 'NGN'})
+    assert donation.status == SUCCESS
+
+
+def test_success_with_wrong_amount_or_currency_is_not_confirmed(app):
+    _donation('ref-amount', 30.0)
+    _donation('ref-currency', 5.0)
+    assert record_transaction({'reference': 'ref-amount', 'status': 'success', 'amount': 1000, 'currency': 'NGN'}).status == AMOUNT_MISMATCH
+    assert record_transaction({'reference': 'ref-currency', 'status': 'success', 'amount': 500, 'currency': 'USD'}).status == AMOUNT_MISMATCH
+    db.session.commit()
+    # Replaying the event does not promote it later.
+    assert record_transaction({'reference': 'ref-amount', 'status': 'success', 'amount': 1000, 'currency': 'NGN'}).status == AMOUNT_MISMATCH
+
+
+def test_webhook_with_non_ascii_signature_is_rejected(client, monkeypatch):
+    from app import paystack
+    monkeypatch.setattr(paystack, 'secret_key', 'sk_test_secret')
+    response = client.post('/api/donation/webhook', data=b'{}', content_type='application/json',
+                           headers={'x-paystack-signature': 'sigénature'})
+    assert response.status_code == 401
+
+
+def test_paying_exactly_what_donate_charged_confirms_donation(client, monkeypatch):
+    from app import paystack
+    charged = {}
+
+    def initialize_transaction(email, amount, **kwargs):
+        charged['amount'] = amount
+        return {'status': True, 'data': {'reference': 'ref-113', 'authorization_url': 'https://paystack.test/pay'}}
+
+    monkeypatch.setattr(paystack, 'initialize_transaction', initialize_transaction)
+    response = client.post('/api/donation', json={'amount': 1.13, 'email': 'donor@example.org'})
+    assert response.status_code == 200
+    assert charged['amount'] == 113
+
+    donation = record_transaction({'reference': 'ref-113', 'status': 'success', 'amount': charged['amount'], 'currency': 'NGN'})
+    assert donation.status == SUCCESS
+
+
+def test_pending_recheck_interval_comes_from_app_config(app, monkeypatch):
+    _donation('ref-recheck', 30.0)
+    calls = []
+    monkeypatch.setattr(paystack, 'verify_transaction', lambda reference: calls.append(reference) or {
+        'status': True, 'data': {'reference': reference, 'status': 'ongoing'}})
+    app.config['PAYSTACK_RECHECK_SECONDS'] = 0
+    assert refresh_status('ref-recheck') == PENDING
+    assert refresh_status('ref-recheck') == PENDING
+    assert len(calls) == 2
@@ -0,0 +1,21 @@
+from app import db
+from app.models import BlogPost
+
+
+def test_spoofed_forwarded_for_does_not_get_a_new_bucket(client, admin):
+    post = BlogPost(title='Post', content='<p>Body</p>', category='News', author_id=admin.id)
+    db.session.add(post)
+    db.session.commit()
+
+    statuses = []
+    for i in range(8):
+        # The client invents the left-most hop; our proxy appends the address it really saw.
+        headers = {'X-Forwarded-For': f'198.51.100.{i}, 203.0.113.7'}
+        response = client.post(f'/api/blog/{post.id}/comments', json={'username': 'u', 'content': 'hi'}, headers=headers)
+        statuses.append(response.status_code)
+    assert statuses == [201] * 5 + [429] * 3
+    assert int(response.headers['Retry-After']) >= 1
+
+    response = client.post(f'/api/blog/{post.id}/comments', json={'username': 'u', 'content': 'hi'},
+                           headers={'X-Forwarded-For': '203.0.113.8'})
+    assert response.status_code == 201
@@ -0,0 +1,23 @@
+def test_search_snippets_carry_only_mark_tags(client, admin_headers):
+    response = client.post('/api/blog', headers=admin_headers, data={
+        'title': 'Fish & <i>chips</i>',
+        'content': '<p>Hello <b>world</b>, fish &amp; chips <script>alert(1)</script></p>',
+        'category': 'News'
+    })
+    assert response.status_code == 201
+
+    response = client.get('/api/blog/search?q=chips')
+    assert response.status_code == 200
+    hit = response.json['results'][0]
+    assert hit['title_highlight'] == 'Fish &amp; <mark>chips</mark>'
+    assert '<mark>chips</mark>' in hit['snippet']
+    assert 'fish &amp; <mark>chips</mark>' in hit['snippet']
+    for markup in ('<p>', '</p>', '<b>', '<script>', '<i>'):
+        assert markup not in hit['snippet'] + hit['title_highlight']
+    assert '&lt;script&gt;' not in hit['snippet']
+
+
+def test_search_works_on_a_database_built_by_create_app(client):
+    response = client.get('/api/content/search?q=anything')
+    assert response.status_code == 200
+    assert response.json['results'] == []